@@ -1,14 +1,34 @@
-import pandas as pd
 import os
 from sqlalchemy.orm import Session
 from models import Candidate, InterviewAnswer
+from answer_archive import get_archived_summaries
+from process_metrics import ITERATION_TIME_METRIC, parse_duration_minutes
 from typing import List, Dict, Any
 from datetime import datetime
 import io
 
+def count_answers(answers, archived_summary=None):
+    """Считает все и валидные ответы кандидата с учётом перенесённых в архив"""
+    total_answers = len(answers)
+    valid_answers = len([a for a in answers if a.is_valid])
+    if archived_summary:
+        total_answers += archived_summary["answers_count"]
+        valid_answers += archived_summary["valid_answers_count"]
+    return total_answers, valid_answers
+
+def get_interview_status(total_answers: int, valid_answers: int):
+    """Статус интервью и процент прохождения по числу всех и валидных ответов"""
+    if not total_answers:
+        return "не начато", 0
+    progress_percent = min(int((valid_answers / total_answers) * 100), 100)
+    if progress_percent == 100:
+        return "пройдено", progress_percent
+    return "в процессе", progress_percent
+
 def get_candidate_statuses(db: Session) -> List[Dict[str, Any]]:
     """Получает статусы всех кандидатов"""
     candidates = db.query(Candidate).all()
+    archived = get_archived_summaries(db)
     candidate_statuses = []
     
     for candidate in candidates:
@@ -16,23 +36,8 @@ def get_candidate_statuses(db: Session) -> List[Dict[str, Any]]:
         answers = db.query(InterviewAnswer).filter(
             InterviewAnswer.candidate_id == candidate.id
         ).all()
-        
-        if not answers:
-            interview_status = "не начато"
-            progress_percent = 0
-        else:
-            total_answers = len(answers)
-            valid_answers = len([a for a in answers if a.is_valid])
-            
-            if total_answers > 0:
-                progress_percent = min(int((valid_answers / total_answers) * 100), 100)
-                if progress_percent == 100:
-                    interview_status = "пройдено"
-                else:
-                    interview_status = "в процессе"
-            else:
-                interview_status = "не начато"
-                progress_percent = 0
+        total_answers, valid_answers = count_answers(answers, archived.get(candidate.id))
+        interview_status, progress_percent = get_interview_status(total_answers, valid_answers)
         
         candidate_statuses.append({
             "id": candidate.id,
@@ -50,6 +55,7 @@ def get_admin_stats(db: Session) -> Dict[str, int]:
     total_candidates = db.query(Candidate).count()
     
     candidates = db.query(Candidate).all()
+    archived = get_archived_summaries(db)
     completed_interviews = 0
     in_progress_interviews = 0
     not_started_interviews = 0
@@ -58,21 +64,15 @@ def get_admin_stats(db: Session) -> Dict[str, int]:
         answers = db.query(InterviewAnswer).filter(
             InterviewAnswer.candidate_id == candidate.id
         ).all()
+        total_answers, valid_answers = count_answers(answers, archived.get(candidate.id))
+        interview_status, _ = get_interview_status(total_answers, valid_answers)
         
-        if not answers:
+        if interview_status == "не начато":
             not_started_interviews += 1
+        elif interview_status == "пройдено":
+            completed_interviews += 1
         else:
-            total_answers = len(answers)
-            valid_answers = len([a for a in answers if a.is_valid])
-            
-            if total_answers > 0:
-                progress_percent = min(int((valid_answers / total_answers) * 100), 100)
-                if progress_percent == 100:
-                    completed_interviews += 1
-                else:
-                    in_progress_interviews += 1
-            else:
-                not_started_interviews += 1
+            in_progress_interviews += 1
     
     return {
         "total_candidates": total_candidates,
@@ -84,28 +84,31 @@ def get_admin_stats(db: Session) -> Dict[str, int]:
 def get_analytics_data(db: Session) -> List[Dict[str, Any]]:
     """Получает аналитические данные"""
     candidates = db.query(Candidate).all()
+    archived = get_archived_summaries(db)
     analytics_data = []
     
     for candidate in candidates:
         answers = db.query(InterviewAnswer).filter(
             InterviewAnswer.candidate_id == candidate.id
         ).all()
+        archived_summary = archived.get(candidate.id)
         
-        if not answers:
+        if not answers and not archived_summary:
             continue
         
-        # Подсчитываем метрики
-        total_time_minutes = 0
-        process_count = len(set([a.process for a in answers if a.process]))
+        # Подсчитываем метрики (архивированные ответы — по сохранённой сводке)
+        total_time_minutes = archived_summary["total_time_minutes"] if archived_summary else 0
+        processes = set([a.process for a in answers if a.process])
+        if archived_summary:
+            processes |= archived_summary["processes"]
+        process_count = len(processes)
         
         # Упрощенный расчет времени (в реальности нужна более сложная логика)
         for answer in answers:
-            if answer.is_valid and answer.question_number == 2:  # Вопрос про время
+            if answer.is_valid and answer.metric == ITERATION_TIME_METRIC:  # Вопрос про время
                 # Пытаемся извлечь число из ответа
-                import re
-                numbers = re.findall(r'\d+', answer.answer)
-                if numbers:
-                    time_minutes = float(numbers[0])
+                time_minutes = parse_duration_minutes(answer.answer)
+                if time_minutes is not None:
                     total_time_minutes += time_minutes
         
         # Примерная стоимость (ставка из .env или 0.5 по умолчанию)
@@ -123,7 +126,11 @@ def get_analytics_data(db: Session) -> List[Dict[str, Any]]:
 
 def export_candidates_data(db: Session) -> str:
     """Экспортирует данные кандидатов в CSV"""
+    # pandas импортируется лениво: чат кандидатов его не использует
+    import pandas as pd
+    
     candidates = db.query(Candidate).all()
+    archived = get_archived_summaries(db)
     
     data = []
     for candidate in candidates:
@@ -131,8 +138,7 @@ def export_candidates_data(db: Session) -> str:
             InterviewAnswer.candidate_id == candidate.id
         ).all()
         
-        total_questions = len(answers)
-        valid_answers = len([a for a in answers if a.is_valid])
+        total_questions, valid_answers = count_answers(answers, archived.get(candidate.id))
         progress_percent = int((valid_answers / total_questions) * 100) if total_questions > 0 else 0
         
         data.append({
@@ -150,42 +156,3 @@ def export_candidates_data(db: Session) -> str:
     output = io.StringIO()
     df.to_csv(output, index=False, encoding='utf-8')
     return output.getvalue()
-
-def update_candidates_from_csv(db: Session, csv_content: str) -> bool:
-    """Обновляет кандидатов из CSV файла"""
-    try:
-        # Читаем CSV из строки
-        df = pd.read_csv(io.StringIO(csv_content))
-        
-        if 'ФИО' not in df.columns or 'Процессы' not in df.columns:
-            return False
-        
-        for _, row in df.iterrows():
-            full_name = str(row['ФИО']).strip()
-            processes = str(row['Процессы']).strip() if pd.notna(row['Процессы']) else ""
-            
-            if full_name:
-                # Ищем существующего кандидата
-                existing_candidate = db.query(Candidate).filter(
-                    Candidate.full_name == full_name
-                ).first()
-                
-                if existing_candidate:
-                    # Обновляем существующего кандидата
-                    existing_candidate.processes = processes
-                else:
-                    # Создаем нового кандидата
-                    new_candidate = Candidate(
-                        full_name=full_name,
-                        processes=processes
-                    )
-                    db.add(new_candidate)
-        
-        db.commit()
-        return True
-        
-    except Exception as e:
-        print(f"Ошибка при обновлении CSV: {e}")
-        db.rollback()
-        return False
-
@@ -1,27 +1,55 @@
 # ai_helper.py
 import random
+import re
+from typing import List, Dict, Optional, Iterator
 
-def generate_follow_up(current_question: str, user_answer: str, profile_context: dict, step_counter: int):
+from prompt_builder import build_prompt
+
+# Подбадривание
+MOTIVATION_PHRASES = [
+    "Отлично, продолжайте в том же духе!",
+    "Вы очень чётко формулируете, спасибо!",
+    "Хорошо идём, расскажите чуть подробнее 👇",
+    "Замечательно! Теперь уточним один момент..."
+]
+
+
+def pick_motivation_phrase() -> str:
+    """Возвращает мотивационную фразу (мгновенно, без обращения к модели)"""
+    return random.choice(MOTIVATION_PHRASES)
+
+
+def stream_follow_up_tokens(current_question: str, user_answer: str, profile_context: dict,
+                            history: Optional[List[Dict[str, str]]] = None) -> Iterator[str]:
     """
-    Имитация интеллектуального помощника.
-    В реальном проекте здесь будет обращение к LLM (например, GPT),
-    который формулирует уточняющие вопросы и мотивационные фразы.
+    Отдаёт уточняющий вопрос по частям, по мере генерации.
+    В реальном проекте здесь будет потоковый вызов LLM (stream=True).
     """
+    # Промпт для будущего вызова LLM; использование токенов пишется в metrics
+    build_prompt(current_question, user_answer, profile_context, history)
+
     # Если ответ слишком короткий, задаем уточнение
     if len(user_answer.strip()) < 10:
         follow_up = f"Можете чуть подробнее рассказать: {current_question.lower()}?"
     else:
         follow_up = "Спасибо! Можете описать следующий шаг этого процесса?"
 
-    # Подбадривание
-    motivation_phrases = [
-        "Отлично, продолжайте в том же духе!",
-        "Вы очень чётко формулируете, спасибо!",
-        "Хорошо идём, расскажите чуть подробнее 👇",
-        "Замечательно! Теперь уточним один момент..."
-    ]
+    # Имитируем токены модели: слова вместе с последующими пробелами
+    for token in re.findall(r"\S+\s*", follow_up):
+        yield token
+
+
+def generate_follow_up(current_question: str, user_answer: str, profile_context: dict, step_counter: int,
+                       history: Optional[List[Dict[str, str]]] = None):
+    """
+    Имитация интеллектуального помощника.
+    В реальном проекте здесь будет обращение к LLM (например, GPT),
+    который формулирует уточняющие вопросы и мотивационные фразы.
+    Промпт собирается в пределах бюджета токенов (см. prompt_builder).
+    """
+    follow_up = "".join(stream_follow_up_tokens(current_question, user_answer, profile_context, history))
 
     return {
         "follow_up_question": follow_up,
-        "motivation_phrase": random.choice(motivation_phrases)
+        "motivation_phrase": pick_motivation_phrase()
     }
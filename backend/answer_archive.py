@@ -0,0 +1,352 @@
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+import metrics
+from models import Candidate, CandidateProcess, InterviewAnswer, AnswerArchive, ArchivedCandidateSummary
+from app_metadata import get_metadata, set_metadata
+from answer_export import answer_schema, answers_to_record_batch, iter_answer_rows
+from data_version import bump_data_generation
+from process_catalog import refresh_process_rollups
+from process_metrics import ITERATION_TIME_METRIC, LEGACY_QUESTION_METRICS, parse_duration_minutes
+
+# Холодное хранение: ответы завершённых кампаний переносятся в Parquet-файлы (zstd),
+# в горячей таблице остаётся только сводка по кандидату
+ANSWER_ARCHIVE_DIR = os.getenv("ANSWER_ARCHIVE_DIR", "archive")
+ARCHIVE_BATCH_SIZE = 10000
+# Кандидатов за один проход: ответы одного кандидата попадают в соседние row group,
+# поэтому чтение архива по candidate_id отсекает лишние row group по статистике
+ARCHIVE_CANDIDATE_CHUNK = 500
+INTERVIEW_COMPLETION_BACKFILL_KEY = "interview_completion_backfilled"
+
+
+class ArchivedAnswer(NamedTuple):
+    """Ответ из архива — с теми же полями, что нужны отчётам от InterviewAnswer"""
+    id: int
+    candidate_id: int
+    question: str
+    answer: str
+    is_valid: bool
+    process: str
+    question_number: int
+    created_at: datetime
+    metric: Optional[str]
+
+
+ARCHIVED_ANSWER_COLUMNS = [
+    "answer_id", "candidate_id", "question", "answer", "is_valid", "process", "question_number", "created_at",
+    "metric"
+]
+
+
+def _archive_columns(path: str) -> List[str]:
+    """Столбцы для чтения: в архивах, записанных до появления ролей, столбца metric нет"""
+    import pyarrow.parquet as pq
+    names = set(pq.read_schema(path).names)
+    return [column for column in ARCHIVED_ANSWER_COLUMNS if column in names]
+
+
+def _archived_answer(record: Dict[str, Any]) -> ArchivedAnswer:
+    if "metric" in record:
+        metric = record["metric"]
+    else:
+        metric = LEGACY_QUESTION_METRICS.get(record["question_number"])
+    return ArchivedAnswer(
+        id=record["answer_id"],
+        candidate_id=record["candidate_id"],
+        question=record["question"],
+        answer=record["answer"],
+        is_valid=record["is_valid"],
+        process=record["process"],
+        question_number=record["question_number"],
+        created_at=record["created_at"],
+        metric=metric
+    )
+
+
+def mark_interview_completed(db: Session, candidate_id: int):
+    """Отмечает, что кандидат ответил на все вопросы плана интервью"""
+    db.execute(
+        update(Candidate)
+        .where(Candidate.id == candidate_id, Candidate.interview_completed_at.is_(None))
+        .values(interview_completed_at=func.now())
+    )
+    db.commit()
+
+
+def backfill_interview_completion(db: Session, questions_count: int):
+    """
+    Один раз отмечает завершёнными интервью, пройденные до появления отметки:
+    есть валидный ответ на каждый вопрос текущего банка по каждому назначенному процессу
+    """
+    if get_metadata(db, INTERVIEW_COMPLETION_BACKFILL_KEY):
+        return
+    answered = (
+        select(InterviewAnswer.candidate_id, InterviewAnswer.process, InterviewAnswer.question_number)
+        .where(InterviewAnswer.is_valid.is_(True))
+        .distinct()
+        .subquery()
+    )
+    answered_counts = dict(
+        db.query(answered.c.candidate_id, func.count()).group_by(answered.c.candidate_id).all()
+    )
+    assigned_counts = dict(
+        db.query(CandidateProcess.candidate_id, func.count())
+        .filter(CandidateProcess.candidate_id.in_(list(answered_counts)))
+        .group_by(CandidateProcess.candidate_id).all()
+    ) if answered_counts else {}
+    completed = [
+        candidate_id for candidate_id, assigned in assigned_counts.items()
+        if answered_counts[candidate_id] >= assigned * questions_count
+    ]
+    for start in range(0, len(completed), ARCHIVE_CANDIDATE_CHUNK):
+        chunk = completed[start:start + ARCHIVE_CANDIDATE_CHUNK]
+        last_answer_at = (
+            select(func.max(InterviewAnswer.created_at))
+            .where(InterviewAnswer.candidate_id == Candidate.id)
+            .scalar_subquery()
+        )
+        db.execute(
+            update(Candidate)
+            .where(Candidate.id.in_(chunk), Candidate.interview_completed_at.is_(None))
+            .values(interview_completed_at=last_answer_at)
+            .execution_options(synchronize_session=False)
+        )
+    set_metadata(db, INTERVIEW_COMPLETION_BACKFILL_KEY, True)
+    db.commit()
+    if completed:
+        print(f"Отмечены завершёнными {len(completed)} интервью, пройденных ранее")
+
+
+def find_archivable_candidates(db: Session, cutoff: datetime) -> List[int]:
+    """
+    Кандидаты, завершившие интервью (ответили на все вопросы плана), у которых
+    все ответы в горячей таблице старше cutoff. Незаконченные интервью не архивируются
+    """
+    return [
+        candidate_id for (candidate_id,) in
+        db.query(InterviewAnswer.candidate_id)
+        .join(Candidate, Candidate.id == InterviewAnswer.candidate_id)
+        .filter(Candidate.interview_completed_at.isnot(None))
+        .group_by(InterviewAnswer.candidate_id)
+        .having(func.max(InterviewAnswer.created_at) < cutoff)
+        .order_by(InterviewAnswer.candidate_id)
+    ]
+
+
+def _add_to_summary(summaries: Dict[int, Dict[str, Any]], row):
+    summary = summaries.get(row.candidate_id)
+    if summary is None:
+        summary = summaries[row.candidate_id] = {
+            "candidate_id": row.candidate_id,
+            "answers_count": 0,
+            "valid_answers_count": 0,
+            "processes": set(),
+            "total_time_minutes": 0.0,
+            "first_answer_at": row.created_at,
+            "last_answer_at": row.created_at,
+        }
+    summary["answers_count"] += 1
+    if row.process:
+        summary["processes"].add(row.process)
+    if row.is_valid:
+        summary["valid_answers_count"] += 1
+        # Тот же упрощённый расчёт времени, что в аналитике админки
+        if row.metric == ITERATION_TIME_METRIC:
+            summary["total_time_minutes"] += parse_duration_minutes(row.answer) or 0
+    if row.created_at is not None:
+        if summary["first_answer_at"] is None or row.created_at < summary["first_answer_at"]:
+            summary["first_answer_at"] = row.created_at
+        if summary["last_answer_at"] is None or row.created_at > summary["last_answer_at"]:
+            summary["last_answer_at"] = row.created_at
+
+
+def archive_answers(db: Session, cutoff: datetime, archive_dir: str = ANSWER_ARCHIVE_DIR) -> Dict[str, Any]:
+    """
+    Переносит ответы кандидатов, завершивших интервью до cutoff, в один Parquet-файл архива
+    и удаляет их из interview_answers. Файл пишется целиком до удаления строк;
+    при ошибке транзакция откатывается, а файл удаляется.
+    """
+    started = time.perf_counter()
+    # Сводки по процессам должны учесть ответы до их удаления из горячей таблицы
+    refresh_process_rollups(db)
+
+    candidate_ids = find_archivable_candidates(db, cutoff)
+    if not candidate_ids:
+        return {"archive_id": None, "file_name": None, "answers_count": 0, "candidates_count": 0}
+
+    import pyarrow.parquet as pq
+
+    os.makedirs(archive_dir, exist_ok=True)
+    file_name = f"answers_{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}.parquet"
+    path = os.path.join(archive_dir, file_name)
+    tmp_path = path + ".tmp"
+    chunks = [
+        candidate_ids[start:start + ARCHIVE_CANDIDATE_CHUNK]
+        for start in range(0, len(candidate_ids), ARCHIVE_CANDIDATE_CHUNK)
+    ]
+    summaries: Dict[int, Dict[str, Any]] = {}
+    answers_count = 0
+
+    try:
+        schema = answer_schema()
+        with pq.ParquetWriter(tmp_path, schema, compression="zstd") as writer:
+            for chunk in chunks:
+                # Условие по cutoff и при чтении, и при удалении: ответ, пришедший во время
+                # архивации, останется в горячей таблице и не потеряется
+                where = (InterviewAnswer.candidate_id.in_(chunk), InterviewAnswer.created_at < cutoff)
+                for rows in iter_answer_rows(db, ARCHIVE_BATCH_SIZE, where):
+                    writer.write_batch(answers_to_record_batch(rows, schema))
+                    for row in rows:
+                        _add_to_summary(summaries, row)
+                    answers_count += len(rows)
+        os.replace(tmp_path, path)
+
+        archive = AnswerArchive(
+            file_name=file_name,
+            cutoff=cutoff,
+            answers_count=answers_count,
+            candidates_count=len(summaries)
+        )
+        db.add(archive)
+        db.flush()
+        db.bulk_insert_mappings(ArchivedCandidateSummary, [
+            {**summary, "archive_id": archive.id, "processes": ", ".join(sorted(summary["processes"]))}
+            for summary in summaries.values()
+        ])
+        for chunk in chunks:
+            db.query(InterviewAnswer).filter(
+                InterviewAnswer.candidate_id.in_(chunk),
+                InterviewAnswer.created_at < cutoff
+            ).delete(synchronize_session=False)
+        db.commit()
+    except Exception:
+        db.rollback()
+        for leftover in (tmp_path, path):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        raise
+    bump_data_generation(db)
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    metrics.increment("answers_archived", answers_count)
+    metrics.observe("answer_archive_runs", {
+        "file_name": file_name, "answers": answers_count, "candidates": len(summaries), "ms": round(elapsed_ms, 1)
+    })
+    print(f"В архив {file_name} перенесено {answers_count} ответов {len(summaries)} кандидатов за {elapsed_ms:.0f} мс")
+    return {
+        "archive_id": archive.id,
+        "file_name": file_name,
+        "answers_count": answers_count,
+        "candidates_count": len(summaries)
+    }
+
+
+def load_archived_answers(db: Session, candidate_id: int, archive_dir: str = ANSWER_ARCHIVE_DIR) -> List[ArchivedAnswer]:
+    """Читает из архивных файлов все ответы кандидата (только нужные row group)"""
+    file_names = [
+        file_name for (file_name,) in
+        db.query(AnswerArchive.file_name)
+        .join(ArchivedCandidateSummary, ArchivedCandidateSummary.archive_id == AnswerArchive.id)
+        .filter(ArchivedCandidateSummary.candidate_id == candidate_id)
+        .order_by(AnswerArchive.id)
+    ]
+    if not file_names:
+        return []
+
+    import pyarrow.parquet as pq
+
+    answers: List[ArchivedAnswer] = []
+    for file_name in file_names:
+        path = os.path.join(archive_dir, file_name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Архивный файл не найден: {path}")
+        table = pq.read_table(path, columns=_archive_columns(path), filters=[("candidate_id", "=", candidate_id)])
+        answers.extend(_archived_answer(record) for record in table.to_pylist())
+    return answers
+
+
+def iter_archived_candidates(db: Session, archive_dir: str = ANSWER_ARCHIVE_DIR,
+                             chunk_size: int = ARCHIVE_CANDIDATE_CHUNK
+                             ) -> Iterator[Tuple[int, int, int, List[ArchivedAnswer]]]:
+    """
+    Архивированные кандидаты по возрастанию id — для сводных отчётов:
+    (candidate_id, всего ответов, валидных ответов, валидные ответы из архива).
+    Счётчики складываются в SQL, ответы читаются пачками по chunk_size кандидатов
+    (только нужные row group) — в памяти одновременно одна пачка.
+    """
+    import pyarrow.parquet as pq
+
+    last_id = None
+    while True:
+        query = (
+            db.query(
+                ArchivedCandidateSummary.candidate_id,
+                func.sum(ArchivedCandidateSummary.answers_count),
+                func.sum(ArchivedCandidateSummary.valid_answers_count)
+            )
+            .group_by(ArchivedCandidateSummary.candidate_id)
+            .order_by(ArchivedCandidateSummary.candidate_id)
+        )
+        if last_id is not None:
+            query = query.filter(ArchivedCandidateSummary.candidate_id > last_id)
+        chunk = query.limit(chunk_size).all()
+        if not chunk:
+            return
+        candidate_ids = [candidate_id for candidate_id, _, _ in chunk]
+        last_id = candidate_ids[-1]
+
+        answers: Dict[int, List[ArchivedAnswer]] = {candidate_id: [] for candidate_id in candidate_ids}
+        file_names = [
+            file_name for (file_name,) in
+            db.query(AnswerArchive.file_name)
+            .join(ArchivedCandidateSummary, ArchivedCandidateSummary.archive_id == AnswerArchive.id)
+            .filter(ArchivedCandidateSummary.candidate_id.in_(candidate_ids))
+            .group_by(AnswerArchive.id, AnswerArchive.file_name)
+            .order_by(AnswerArchive.id)
+        ]
+        for file_name in file_names:
+            path = os.path.join(archive_dir, file_name)
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Архивный файл не найден: {path}")
+            table = pq.read_table(path, columns=_archive_columns(path), filters=[
+                ("candidate_id", "in", candidate_ids), ("is_valid", "=", True)
+            ])
+            for record in table.to_pylist():
+                answers[record["candidate_id"]].append(_archived_answer(record))
+
+        for candidate_id, answers_count, valid_answers_count in chunk:
+            candidate_answers = sorted(answers[candidate_id], key=lambda answer: answer.id)
+            yield candidate_id, int(answers_count or 0), int(valid_answers_count or 0), candidate_answers
+
+
+def get_archived_summaries(db: Session) -> Dict[int, Dict[str, Any]]:
+    """Сводки по архивированным ответам, сложенные по кандидатам (для статусов и аналитики админки)"""
+    result: Dict[int, Dict[str, Any]] = {}
+    for summary in db.query(ArchivedCandidateSummary):
+        item = result.setdefault(summary.candidate_id, {
+            "answers_count": 0, "valid_answers_count": 0, "processes": set(), "total_time_minutes": 0.0
+        })
+        item["answers_count"] += summary.answers_count
+        item["valid_answers_count"] += summary.valid_answers_count
+        item["total_time_minutes"] += summary.total_time_minutes or 0
+        item["processes"].update(p.strip() for p in (summary.processes or "").split(",") if p.strip())
+    return result
+
+
+def list_archives(db: Session) -> List[Dict[str, Any]]:
+    """Список архивов ответов (новые сверху)"""
+    return [
+        {
+            "id": archive.id,
+            "file_name": archive.file_name,
+            "cutoff": archive.cutoff,
+            "answers_count": archive.answers_count,
+            "candidates_count": archive.candidates_count,
+            "created_at": archive.created_at
+        }
+        for archive in db.query(AnswerArchive).order_by(AnswerArchive.id.desc())
+    ]
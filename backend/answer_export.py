@@ -0,0 +1,134 @@
+from typing import Iterable, Iterator, List, Dict, Any, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import Candidate, InterviewAnswer
+from process_metrics import NUMERIC_METRICS, parse_metric_value
+
+# Размер пачки при чтении курсором и размер row group / record batch в файле
+EXPORT_BATCH_SIZE = 10000
+EXPORT_FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+
+def parse_number(answer: str, metric: Optional[str]):
+    """Извлекает число из ответа на числовой вопрос (как calculate_process_metrics)"""
+    if metric not in NUMERIC_METRICS:
+        return None
+    return parse_metric_value(answer, metric)
+
+
+def answer_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ("answer_id", pa.int64()),
+        ("candidate_id", pa.int64()),
+        ("full_name", pa.string()),
+        ("process", pa.dictionary(pa.int32(), pa.string())),
+        ("question_number", pa.int16()),
+        ("metric", pa.dictionary(pa.int8(), pa.string())),
+        ("question", pa.dictionary(pa.int32(), pa.string())),
+        ("answer", pa.string()),
+        ("is_valid", pa.bool_()),
+        ("parsed_number", pa.float64()),
+        ("created_at", pa.timestamp("us", tz="UTC")),
+    ])
+
+
+def iter_answer_rows(db: Session, batch_size: int = EXPORT_BATCH_SIZE,
+                     where: Iterable[Any] = ()) -> Iterator[List[Any]]:
+    """Читает ответы серверным курсором пачками по batch_size строк (с дополнительными условиями where)"""
+    query = (
+        select(
+            InterviewAnswer.id, InterviewAnswer.candidate_id, Candidate.full_name,
+            InterviewAnswer.process, InterviewAnswer.question_number, InterviewAnswer.metric, InterviewAnswer.question,
+            InterviewAnswer.answer, InterviewAnswer.is_valid, InterviewAnswer.created_at
+        )
+        .join(Candidate, Candidate.id == InterviewAnswer.candidate_id)
+        .where(*where)
+        .order_by(InterviewAnswer.id)
+        .execution_options(stream_results=True, yield_per=batch_size)
+    )
+    result = db.execute(query)
+    for partition in result.partitions():
+        yield partition
+
+
+def answers_to_record_batch(rows: List[Any], schema):
+    import pyarrow as pa
+    columns: Dict[str, list] = {name: [] for name in schema.names}
+    for row in rows:
+        columns["answer_id"].append(row.id)
+        columns["candidate_id"].append(row.candidate_id)
+        columns["full_name"].append(row.full_name)
+        columns["process"].append(row.process)
+        columns["question_number"].append(row.question_number)
+        columns["metric"].append(row.metric)
+        columns["question"].append(row.question)
+        columns["answer"].append(row.answer)
+        columns["is_valid"].append(row.is_valid)
+        columns["parsed_number"].append(parse_number(row.answer, row.metric))
+        columns["created_at"].append(row.created_at)
+    return pa.RecordBatch.from_pydict(columns, schema=schema)
+
+
+class _ChunkSink:
+    """Файлоподобный приёмник: накапливает записанные байты, чтобы отдавать их клиенту по мере готовности"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def stream_answers_export(db: Session, export_format: str = "parquet",
+                          batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """
+    Отдаёт все ответы интервью в колоночном формате по частям:
+    parquet — одна row group на пачку, arrow — поток Arrow IPC (record batch на пачку).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = answer_schema()
+    sink = _ChunkSink()
+    if export_format == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+        write = writer.write_batch
+    elif export_format == "arrow":
+        writer = pa.ipc.new_stream(sink, schema, options=pa.ipc.IpcWriteOptions(compression="zstd"))
+        write = writer.write_batch
+    else:
+        raise ValueError(f"Неподдерживаемый формат экспорта: {export_format}")
+
+    for rows in iter_answer_rows(db, batch_size):
+        write(answers_to_record_batch(rows, schema))
+        data = sink.drain()
+        if data:
+            yield data
+    writer.close()
+    data = sink.drain()
+    if data:
+        yield data
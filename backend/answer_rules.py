@@ -0,0 +1,158 @@
+import json
+import os
+import re
+from typing import Callable, Dict, List, Optional, Any
+
+from process_metrics import parse_duration_minutes
+
+# Путь к JSON с правилами валидации (необязательный, иначе используются правила по умолчанию)
+ANSWER_RULES_FILE = os.getenv("ANSWER_RULES_FILE", "")
+
+# Ограничение кэша классификации вопросов не из плана
+QUESTION_CACHE_LIMIT = 1024
+
+CLARIFY_NUMBER = "Пожалуйста, уточните точнее (в минутах или количестве)."
+CLARIFY_DURATION = "Пожалуйста, уточните длительность (например, «15 минут» или «1,5 часа»)."
+CLARIFY_TEXT = "Пожалуйста, уточните ваш ответ более конкретно."
+
+# Прежние имена типов валидаторов: ещё встречаются в сохранённых версиях банка вопросов
+# и файлах правил
+VALIDATOR_ALIASES = {"minutes": "duration"}
+
+# Валидаторы-парсеры: ответ валиден, если из него извлекается значение
+VALUE_PARSERS: Dict[str, Callable[[str], Optional[float]]] = {
+    "duration": parse_duration_minutes,
+}
+
+DEFAULT_RULES: Dict[str, Any] = {
+    # Неопределённые формулировки — ответ с ними считается невалидным
+    "vague_phrases": ["иногда", "по-разному", "обычно", "когда как"],
+    # Типы валидаторов: регулярное выражение, которое должно найтись в ответе,
+    # или парсер значения из VALUE_PARSERS
+    "validators": {
+        "numeric": {"pattern": r"\d+", "clarification": CLARIFY_NUMBER},
+        # Длительность с единицами («2 часа», «1.5h», «1 час 30 минут»), переводится в минуты;
+        # число без единиц — минуты, как и прежде
+        "duration": {"parser": "duration", "clarification": CLARIFY_DURATION},
+        "frequency": {"pattern": r"\d+", "clarification": CLARIFY_NUMBER},
+        "free_text": {"pattern": None, "clarification": CLARIFY_TEXT}
+    },
+    # Тип валидатора для вопроса по его номеру (1-based)
+    "question_types": {"2": "duration", "3": "frequency", "4": "numeric"},
+    # Для вопросов не из списка: ключевые слова, при которых нужен числовой ответ
+    "fallback_keywords": ["время", "минут", "часто", "раз", "сессию"]
+}
+
+
+def _compile_alternation(words: List[str]) -> Optional["re.Pattern"]:
+    """Собирает список фраз в одно регулярное выражение"""
+    words = [w for w in words if w]
+    if not words:
+        return None
+    # Длинные фразы раньше, чтобы альтернатива не обрывалась на префиксе
+    escaped = sorted((re.escape(w.lower()) for w in words), key=len, reverse=True)
+    return re.compile("|".join(escaped), re.IGNORECASE)
+
+
+class AnswerRuleEngine:
+    """Скомпилированные правила валидации ответов"""
+
+    def __init__(self, rules: Dict[str, Any], questions: List[str]):
+        self.vague_regex = _compile_alternation(rules.get("vague_phrases", []))
+        self.fallback_regex = _compile_alternation(rules.get("fallback_keywords", []))
+
+        self.validators: Dict[str, Optional["re.Pattern"]] = {}
+        self.parsers: Dict[str, Callable[[str], Optional[float]]] = {}
+        self.clarifications: Dict[str, str] = {}
+        for name, spec in rules.get("validators", {}).items():
+            parser = spec.get("parser")
+            if parser:
+                if parser not in VALUE_PARSERS:
+                    raise ValueError(f"Неизвестный парсер валидатора {name}: {parser}")
+                self.parsers[name] = VALUE_PARSERS[parser]
+            pattern = spec.get("pattern")
+            self.validators[name] = re.compile(pattern, re.IGNORECASE) if pattern else None
+            self.clarifications[name] = spec.get("clarification", CLARIFY_TEXT)
+        if "free_text" not in self.validators:
+            self.validators["free_text"] = None
+            self.clarifications["free_text"] = CLARIFY_TEXT
+        for alias, name in VALIDATOR_ALIASES.items():
+            if alias not in self.validators and name in self.validators:
+                self.validators[alias] = self.validators[name]
+                self.clarifications[alias] = self.clarifications[name]
+                if name in self.parsers:
+                    self.parsers[alias] = self.parsers[name]
+
+        # Текст вопроса -> тип валидатора (известные вопросы сопоставляются заранее)
+        self.question_types: Dict[str, str] = {}
+        for number, validator_type in rules.get("question_types", {}).items():
+            index = int(number) - 1
+            if 0 <= index < len(questions):
+                if validator_type not in self.validators:
+                    raise ValueError(f"Неизвестный тип валидатора: {validator_type}")
+                self.question_types[questions[index]] = validator_type
+        for question in questions:
+            self.question_types.setdefault(question, "free_text")
+
+    def get_question_type(self, question: str) -> str:
+        """Возвращает тип валидатора для вопроса"""
+        validator_type = self.question_types.get(question)
+        if validator_type is None:
+            # Вопрос не из плана (например, с префиксом процесса) — классифицируем по ключевым словам
+            if self.fallback_regex is not None and self.fallback_regex.search(question):
+                validator_type = "numeric"
+            else:
+                validator_type = "free_text"
+            if len(self.question_types) < QUESTION_CACHE_LIMIT:
+                self.question_types[question] = validator_type
+        return validator_type
+
+    def is_vague(self, answer: str) -> bool:
+        """Проверяет ответ на неопределённые формулировки"""
+        return self.vague_regex is not None and self.vague_regex.search(answer) is not None
+
+    def validate(self, answer: str, question: str) -> bool:
+        """Проверяет валидность ответа"""
+        return self.validate_typed(answer, self.get_question_type(question))
+
+    def validate_typed(self, answer: str, validator_type: str) -> bool:
+        """Проверяет ответ валидатором заданного типа"""
+        if self.is_vague(answer):
+            return False
+        validator = self.validators.get(validator_type)
+        if validator is not None and validator.search(answer) is None:
+            return False
+        parser = self.parsers.get(validator_type)
+        if parser is not None and parser(answer) is None:
+            return False
+        return True
+
+    def get_clarification(self, question: str) -> str:
+        """Возвращает уточняющий вопрос для типа валидатора"""
+        return self.clarifications[self.get_question_type(question)]
+
+    def get_typed_clarification(self, validator_type: str) -> str:
+        """Возвращает уточняющий вопрос по типу валидатора"""
+        return self.clarifications.get(validator_type, CLARIFY_TEXT)
+
+
+def load_rules(questions: List[str], rules_path: str = ANSWER_RULES_FILE) -> AnswerRuleEngine:
+    """
+    Загружает правила из конфигурации (JSON поверх правил по умолчанию) и компилирует их.
+    Словари (validators, question_types) объединяются по ключам: файл может переопределить
+    один валидатор, не перечисляя остальные
+    """
+    rules = dict(DEFAULT_RULES)
+    if rules_path:
+        if os.path.exists(rules_path):
+            with open(rules_path, encoding="utf-8") as f:
+                overrides = json.load(f)
+            for key, value in overrides.items():
+                if isinstance(value, dict) and isinstance(rules.get(key), dict):
+                    rules[key] = {**rules[key], **value}
+                else:
+                    rules[key] = value
+            print(f"Правила валидации загружены из {rules_path}")
+        else:
+            print(f"Файл правил валидации {rules_path} не найден, используются правила по умолчанию")
+    return AnswerRuleEngine(rules, questions)
@@ -0,0 +1,164 @@
+import html
+import re
+from typing import Any, Dict, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+# Полнотекстовый поиск по ответам интервью:
+# PostgreSQL — GIN-индекс по to_tsvector('russian', answer) (русская морфология),
+# SQLite — FTS5-таблица с триггерами (локальная замена для разработки: без морфологии,
+# «отчётов» не найдёт «отчёт», ищется только по началу слова).
+# Ищутся только ответы в interview_answers — архивные (Parquet) в поиск не попадают.
+SEARCH_CONFIG = "russian"
+SEARCH_MAX_PAGE_SIZE = 100
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+# База размечает совпадения управляющими символами: текст ответа экранируется
+# и только потом маркеры заменяются на HTML-теги подсветки
+MARK_START = "\x02"
+MARK_STOP = "\x03"
+
+POSTGRES_INDEX_DDL = (
+    "CREATE INDEX IF NOT EXISTS ix_interview_answers_answer_fts "
+    f"ON interview_answers USING GIN (to_tsvector('{SEARCH_CONFIG}', answer))"
+)
+
+SQLITE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS interview_answers_fts USING fts5("
+    "answer, content='interview_answers', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS interview_answers_fts_ai AFTER INSERT ON interview_answers BEGIN "
+    "INSERT INTO interview_answers_fts(rowid, answer) VALUES (new.id, new.answer); END",
+    "CREATE TRIGGER IF NOT EXISTS interview_answers_fts_ad AFTER DELETE ON interview_answers BEGIN "
+    "INSERT INTO interview_answers_fts(interview_answers_fts, rowid, answer) VALUES ('delete', old.id, old.answer); END",
+    "CREATE TRIGGER IF NOT EXISTS interview_answers_fts_au AFTER UPDATE OF answer ON interview_answers BEGIN "
+    "INSERT INTO interview_answers_fts(interview_answers_fts, rowid, answer) VALUES ('delete', old.id, old.answer); "
+    "INSERT INTO interview_answers_fts(rowid, answer) VALUES (new.id, new.answer); END",
+]
+
+
+def ensure_search_index(engine: Engine):
+    """Создаёт полнотекстовый индекс по ответам, если его ещё нет"""
+    dialect = engine.dialect.name
+    with engine.begin() as conn:
+        if dialect == "postgresql":
+            conn.execute(text(POSTGRES_INDEX_DDL))
+        elif dialect == "sqlite":
+            exists = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'interview_answers_fts'"
+            )).first()
+            for ddl in SQLITE_FTS_DDL:
+                conn.execute(text(ddl))
+            if not exists:
+                # Индексируем ответы, сохранённые до появления FTS-таблицы
+                conn.execute(text("INSERT INTO interview_answers_fts(interview_answers_fts) VALUES ('rebuild')"))
+        else:
+            print(f"Полнотекстовый поиск не поддерживается для {dialect}")
+
+
+def _fts5_query(query: str) -> str:
+    """Превращает пользовательский запрос в безопасный запрос FTS5 (все слова, по префиксу)"""
+    terms = re.findall(r"\w+", query)
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def _highlight(snippet: Optional[str]) -> Optional[str]:
+    """Экранирует фрагмент ответа как HTML и превращает маркеры совпадений в <mark>"""
+    if snippet is None:
+        return None
+    parts = []
+    opened = False
+    # Маркеры могли оказаться и в самом ответе — теги всегда парные
+    for piece in re.split(f"([{MARK_START}{MARK_STOP}])", snippet):
+        if piece == MARK_START:
+            if not opened:
+                parts.append(HIGHLIGHT_START)
+                opened = True
+        elif piece == MARK_STOP:
+            if opened:
+                parts.append(HIGHLIGHT_STOP)
+                opened = False
+        else:
+            parts.append(html.escape(piece))
+    if opened:
+        parts.append(HIGHLIGHT_STOP)
+    return "".join(parts)
+
+
+def _filters(process: Optional[str], question_number: Optional[int]):
+    clauses, params = [], {}
+    if process:
+        clauses.append("a.process = :process")
+        params["process"] = process
+    if question_number is not None:
+        clauses.append("a.question_number = :question_number")
+        params["question_number"] = question_number
+    return "".join(f" AND {clause}" for clause in clauses), params
+
+
+def search_answers(db: Session, query: str, process: Optional[str] = None,
+                   question_number: Optional[int] = None, page: int = 1,
+                   page_size: int = 20) -> Dict[str, Any]:
+    """
+    Ищет ответы по тексту с фильтрами, постранично, с подсветкой совпадений.
+    snippet — HTML: текст ответа экранирован, совпадения обёрнуты в <mark>
+    """
+    page = max(page, 1)
+    page_size = min(max(page_size, 1), SEARCH_MAX_PAGE_SIZE)
+    filters, params = _filters(process, question_number)
+    params.update({
+        "limit": page_size, "offset": (page - 1) * page_size,
+        "mark_start": MARK_START, "mark_stop": MARK_STOP
+    })
+    dialect = db.bind.dialect.name
+
+    if dialect == "postgresql":
+        params["query"] = query
+        params["headline_options"] = f"StartSel={MARK_START}, StopSel={MARK_STOP}, MaxFragments=2"
+        match = (
+            f"FROM interview_answers a JOIN candidates c ON c.id = a.candidate_id, "
+            f"websearch_to_tsquery('{SEARCH_CONFIG}', :query) q "
+            f"WHERE to_tsvector('{SEARCH_CONFIG}', a.answer) @@ q{filters}"
+        )
+        select_sql = (
+            f"SELECT a.id, c.full_name, a.process, a.question_number, a.is_valid, a.created_at, "
+            f"ts_headline('{SEARCH_CONFIG}', a.answer, q, :headline_options) AS snippet "
+            f"{match} ORDER BY ts_rank(to_tsvector('{SEARCH_CONFIG}', a.answer), q) DESC, a.id DESC "
+            f"LIMIT :limit OFFSET :offset"
+        )
+    elif dialect == "sqlite":
+        params["query"] = _fts5_query(query)
+        if not params["query"]:
+            return {"total": 0, "page": page, "page_size": page_size, "results": []}
+        match = (
+            "FROM interview_answers_fts f JOIN interview_answers a ON a.id = f.rowid "
+            "JOIN candidates c ON c.id = a.candidate_id "
+            f"WHERE interview_answers_fts MATCH :query{filters}"
+        )
+        select_sql = (
+            "SELECT a.id, c.full_name, a.process, a.question_number, a.is_valid, a.created_at, "
+            "snippet(interview_answers_fts, 0, :mark_start, :mark_stop, '…', 16) AS snippet "
+            f"{match} ORDER BY bm25(interview_answers_fts), a.id DESC LIMIT :limit OFFSET :offset"
+        )
+    else:
+        raise ValueError(f"Полнотекстовый поиск не поддерживается для {dialect}")
+
+    total = db.execute(text(f"SELECT count(*) {match}"), params).scalar()
+    rows = db.execute(text(select_sql), params).mappings().all()
+    return {
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "results": [
+            {
+                "answer_id": row["id"],
+                "full_name": row["full_name"],
+                "process": row["process"],
+                "question_number": row["question_number"],
+                "is_valid": bool(row["is_valid"]),
+                "snippet": _highlight(row["snippet"]),
+                "created_at": row["created_at"]
+            }
+            for row in rows
+        ]
+    }
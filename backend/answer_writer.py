@@ -0,0 +1,201 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Any, List, Tuple, Optional
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+import metrics
+from database import SessionLocal
+from models import InterviewAnswer
+from data_version import bump_data_generation
+
+# Режим записи ответов: "sync" — commit на каждый ответ, "write_behind" — групповой commit из буфера
+ANSWER_WRITE_MODE = os.getenv("ANSWER_WRITE_MODE", "sync")
+ANSWER_WRITE_BATCH_SIZE = int(os.getenv("ANSWER_WRITE_BATCH_SIZE", "200"))
+ANSWER_WRITE_FLUSH_MS = int(os.getenv("ANSWER_WRITE_FLUSH_MS", "5"))
+ANSWER_WRITE_QUEUE_SIZE = int(os.getenv("ANSWER_WRITE_QUEUE_SIZE", "10000"))
+# Ждать ли подтверждения commit перед ответом клиенту
+ANSWER_WRITE_ACK = os.getenv("ANSWER_WRITE_ACK", "true").lower() == "true"
+# Сколько секунд ждать подтверждения commit; дольше не ждём — ответ уже в очереди
+# и будет записан пакетом, поэтому интервью продолжается без подтверждения (как с ANSWER_WRITE_ACK=false)
+ANSWER_WRITE_ACK_TIMEOUT_SECONDS = float(os.getenv("ANSWER_WRITE_ACK_TIMEOUT_SECONDS", "10"))
+
+
+class WriteBufferFull(Exception):
+    """Буфер записи переполнен или остановлен: ответ не принят, запрос можно безопасно повторить"""
+
+
+def _set_result(future: Future, result):
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_exception(future: Future, exception: BaseException):
+    if not future.done():
+        future.set_exception(exception)
+
+
+class AnswerWriteBehind:
+    """Буфер ответов интервью с пакетной записью в фоновом потоке"""
+
+    def __init__(self, session_factory=SessionLocal, batch_size: int = ANSWER_WRITE_BATCH_SIZE,
+                 flush_interval_ms: int = ANSWER_WRITE_FLUSH_MS, max_queue: int = ANSWER_WRITE_QUEUE_SIZE):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self._queue: "queue.Queue[Tuple[Dict[str, Any], Future]]" = queue.Queue(maxsize=max_queue)
+        self._stopping = threading.Event()
+        # Проверка остановки и постановка в очередь идут под той же блокировкой, что и остановка:
+        # иначе ответ мог попасть в очередь после финального сброса, и его Future не завершился бы
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Запускает фоновый поток записи"""
+        if self.running:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="answer-write-behind", daemon=True)
+        self._thread.start()
+
+    def submit(self, row: Dict[str, Any]) -> Future:
+        """Ставит ответ в очередь; Future завершается после commit пакета"""
+        future: Future = Future()
+        with self._lock:
+            if self._stopping.is_set() or not self.running:
+                raise WriteBufferFull("Буфер записи остановлен")
+            try:
+                # Не ждём места в буфере: при переполнении сразу отказываем (backpressure)
+                self._queue.put_nowait((row, future))
+            except queue.Full:
+                metrics.increment("answer_buffer_rejected")
+                raise WriteBufferFull("Буфер записи ответов переполнен")
+        return future
+
+    def stop(self, timeout: float = 10.0):
+        """Останавливает запись, предварительно сбросив всё, что осталось в буфере"""
+        with self._lock:
+            self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                # Поток ещё пишет (например, завис commit): остаток очереди он допишет сам,
+                # параллельный сброс из этого потока только столкнулся бы с ним
+                print(f"Буфер записи ответов не остановился за {timeout} c, в очереди {self._queue.qsize()} ответов")
+                return
+            self._thread = None
+        # Поток завершился — дописываем то, что могло остаться, синхронно; новых ответов в очереди уже не будет.
+        # Ответы, которые записать не удалось, завершаются ошибкой, а не остаются ждать вечно
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch:
+                break
+            self._flush_batch(batch)
+
+    def _drain(self, limit: int) -> List[Tuple[Dict[str, Any], Future]]:
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            # Добираем пакет до batch_size или до истечения интервала
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._flush_batch(batch)
+
+    def _flush_batch(self, batch: List[Tuple[Dict[str, Any], Future]]):
+        """Записывает пакет; любая ошибка завершает его Future, а не фоновый поток"""
+        try:
+            self._flush(batch)
+        except Exception as e:
+            metrics.increment("answer_buffer_failed", len(batch))
+            print(f"Не удалось записать пакет ответов ({len(batch)} шт.): {e}")
+            for _, future in batch:
+                _set_exception(future, e)
+
+    def _flush(self, batch: List[Tuple[Dict[str, Any], Future]]):
+        """Записывает пакет одним multi-row insert и одним commit"""
+        db = self.session_factory()
+        try:
+            db.execute(insert(InterviewAnswer), [row for row, _ in batch])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Ошибка при пакетной записи ответов ({len(batch)} шт.): {e}")
+            # Пишем по одному, чтобы ошибка одной строки не отклонила весь пакет
+            self._flush_one_by_one(db, batch)
+            db.close()
+            return
+        # Версия данных админки меняется один раз на пакет, уже после commit
+        bump_data_generation(db)
+        db.close()
+        metrics.increment("answer_buffer_flushes")
+        metrics.increment("answer_buffer_rows", len(batch))
+        for _, future in batch:
+            _set_result(future, True)
+
+    def _flush_one_by_one(self, db: Session, batch: List[Tuple[Dict[str, Any], Future]]):
+        written = 0
+        for row, future in batch:
+            try:
+                db.execute(insert(InterviewAnswer), [row])
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                metrics.increment("answer_buffer_failed")
+                _set_exception(future, e)
+                continue
+            written += 1
+            metrics.increment("answer_buffer_rows")
+            _set_result(future, True)
+        if written:
+            bump_data_generation(db)
+
+
+# Глобальный буфер (используется только в режиме write_behind)
+answer_writer = AnswerWriteBehind() if ANSWER_WRITE_MODE == "write_behind" else None
+
+
+async def save_answer(db: Session, row: Dict[str, Any]):
+    """Сохраняет ответ интервью в выбранном режиме записи"""
+    if answer_writer is None:
+        db.add(InterviewAnswer(**row))
+        db.commit()
+        # Версия данных админки меняется после commit, без блокировки общей строки в транзакции ответа
+        bump_data_generation(db)
+        return
+    future = answer_writer.submit(row)
+    if ANSWER_WRITE_ACK:
+        # Подтверждение долговечности: ждём commit пакета, не блокируя event loop.
+        # shield — чтобы таймаут не отменил сам Future: ответ всё равно будет записан пакетом.
+        # По таймауту ошибку не возвращаем: ответ уже принят, и повтор запроса записал бы его второй раз
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), ANSWER_WRITE_ACK_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            metrics.increment("answer_buffer_ack_timeouts")
+            print(f"Запись ответа не подтверждена за {ANSWER_WRITE_ACK_TIMEOUT_SECONDS} c, ответ остаётся в очереди")
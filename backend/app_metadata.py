@@ -0,0 +1,20 @@
+import json
+from typing import Any, Optional
+from sqlalchemy.orm import Session
+
+from models import AppMetadata
+
+
+def get_metadata(db: Session, key: str) -> Optional[Any]:
+    """Возвращает служебное значение по ключу (или None)"""
+    row = db.query(AppMetadata).filter(AppMetadata.key == key).first()
+    return json.loads(row.value) if row else None
+
+
+def set_metadata(db: Session, key: str, value: Any):
+    """Сохраняет служебное значение (без commit)"""
+    row = db.query(AppMetadata).filter(AppMetadata.key == key).first()
+    if row is None:
+        db.add(AppMetadata(key=key, value=json.dumps(value, ensure_ascii=False)))
+    else:
+        row.value = json.dumps(value, ensure_ascii=False)
@@ -0,0 +1,68 @@
+"""
+Микробенчмарк валидации ответов: прежняя реализация (списки + any(... in ...))
+против скомпилированного движка правил.
+
+Запуск из каталога backend:
+    python benchmarks/bench_answer_rules.py [количество_ответов]
+"""
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from interview_logic import INTERVIEW_QUESTIONS, answer_rules
+
+SAMPLE_ANSWERS = [
+    "15 минут",
+    "Обычно около получаса",
+    "2 раза в день",
+    "Иногда по-разному, когда как",
+    "Получаю письмо от руководителя и открываю задачу в Jira",
+    "Excel, 1С и почта",
+    "5",
+    "Когда отчёт отправлен заказчику",
+]
+
+
+def legacy_validate(answer: str, question: str) -> bool:
+    """Реализация InterviewManager.validate_answer до перехода на движок правил"""
+    answer_lower = answer.lower()
+    vague_words = ["иногда", "по-разному", "обычно", "когда как"]
+    if any(word in answer_lower for word in vague_words):
+        return False
+    time_questions = ["время", "минут", "часто", "раз", "сессию"]
+    if any(word in question.lower() for word in time_questions):
+        if not re.search(r'\d+', answer):
+            return False
+    return True
+
+
+def run(name, func, pairs):
+    start = time.perf_counter()
+    valid = 0
+    for answer, question in pairs:
+        if func(answer, question):
+            valid += 1
+    elapsed = time.perf_counter() - start
+    print(f"{name:<10} {elapsed:8.3f} c  {len(pairs) / elapsed:12,.0f} ответов/с  валидных: {valid}")
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = random.Random(42)
+    pairs = [(rng.choice(SAMPLE_ANSWERS), rng.choice(INTERVIEW_QUESTIONS)) for _ in range(count)]
+
+    mismatches = sum(1 for a, q in pairs[:10000] if legacy_validate(a, q) != answer_rules.validate(a, q))
+    print(f"Ответов: {count}, расхождений с прежней реализацией (первые 10000): {mismatches}")
+
+    legacy = run("legacy", legacy_validate, pairs)
+    compiled = run("compiled", answer_rules.validate, pairs)
+    print(f"Ускорение: x{legacy / compiled:.2f}")
+
+
+if __name__ == "__main__":
+    main()
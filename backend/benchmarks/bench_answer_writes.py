@@ -0,0 +1,93 @@
+"""
+Бенчмарк записи ответов интервью: commit на каждый ответ против буфера write-behind.
+Меряется тот же путь, что в /api/chat: save_answer (с версией данных админки) в event loop,
+не больше [потоков] ответов одновременно.
+
+Запуск из каталога backend (по умолчанию — временная SQLite-база,
+для Postgres задайте DATABASE_URL):
+    python benchmarks/bench_answer_writes.py [ответов] [потоков]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench_writes.db"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import SessionLocal, create_tables
+from models import Candidate, InterviewAnswer
+import answer_writer
+from answer_writer import AnswerWriteBehind, save_answer
+
+
+def make_row(candidate_id: int, i: int):
+    return {
+        "candidate_id": candidate_id,
+        "question": "Процесс: Бенчмарк\n\nСколько времени занимает одна итерация (в минутах)?",
+        "answer": f"{i % 60 + 1} минут",
+        "is_valid": True,
+        "process": "Бенчмарк",
+        "question_number": 2,
+        "metric": "iteration_time"
+    }
+
+
+async def write_all(candidate_id: int, count: int, workers: int) -> float:
+    """Как одновременные запросы /api/chat: у каждого своя сессия, ответ пишется через save_answer"""
+    semaphore = asyncio.Semaphore(workers)
+
+    async def write(i):
+        async with semaphore:
+            db = SessionLocal()
+            try:
+                await save_answer(db, make_row(candidate_id, i))
+            finally:
+                db.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(write(i) for i in range(count)))
+    return time.perf_counter() - start
+
+
+def bench_sync(candidate_id: int, count: int, workers: int) -> float:
+    answer_writer.answer_writer = None
+    return asyncio.run(write_all(candidate_id, count, workers))
+
+
+def bench_write_behind(candidate_id: int, count: int, workers: int) -> float:
+    writer = AnswerWriteBehind(max_queue=count + 1)
+    writer.start()
+    answer_writer.answer_writer = writer
+    try:
+        return asyncio.run(write_all(candidate_id, count, workers))
+    finally:
+        answer_writer.answer_writer = None
+        writer.stop()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+
+    create_tables()
+    db = SessionLocal()
+    candidate = db.query(Candidate).filter(Candidate.full_name == "Бенчмарк Бенчмарк").first()
+    if candidate is None:
+        candidate = Candidate(full_name="Бенчмарк Бенчмарк", processes="Бенчмарк")
+        db.add(candidate)
+        db.commit()
+    candidate_id = candidate.id
+    db.close()
+
+    print(f"База: {os.environ['DATABASE_URL']}, ответов: {count}, потоков: {workers}")
+    for name, func in [("sync", bench_sync), ("write_behind", bench_write_behind)]:
+        elapsed = func(candidate_id, count, workers)
+        print(f"{name:<13} {elapsed:8.3f} c  {count / elapsed:10,.0f} ответов/с")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Бенчмарк холодного старта воркера: время импорта main и RSS процесса.
+Каждый замер — отдельный процесс python, чтобы модули не были закэшированы.
+
+Запуск из каталога backend:
+    python benchmarks/bench_startup.py                    # замер и сравнение с baseline
+    python benchmarks/bench_startup.py --save-baseline    # сохранить текущие результаты как baseline
+
+Код выхода 1, если время импорта или RSS выросли больше порога (--threshold, по умолчанию 20%).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(BACKEND_DIR, "benchmarks", "results", "startup_baseline.json")
+
+# Выполняется в дочернем процессе: импорт приложения без старта сервера и подключения к БД
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+heavy = [name for name in ("pandas", "reportlab", "openpyxl", "pyarrow") if name in sys.modules]
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"import_seconds": elapsed, "rss_mb": rss_kb / 1024, "heavy_modules": heavy}))
+"""
+
+
+def probe(preload: bool) -> dict:
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", f"sqlite:///{tempfile.gettempdir()}/bench_startup.db")
+    env["PRELOAD_HEAVY_MODULES"] = "true" if preload else "false"
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure(preload: bool, runs: int) -> dict:
+    samples = [probe(preload) for _ in range(runs)]
+    return {
+        "import_seconds": statistics.median(s["import_seconds"] for s in samples),
+        "rss_mb": statistics.median(s["rss_mb"] for s in samples),
+        "heavy_modules": samples[-1]["heavy_modules"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.20)
+    args = parser.parse_args()
+
+    results = {"lazy": measure(False, args.runs), "preload": measure(True, args.runs)}
+    for mode, result in results.items():
+        print(f"{mode:<8} импорт {result['import_seconds']:.3f} c  RSS {result['rss_mb']:.1f} МБ  "
+              f"тяжёлые модули: {', '.join(result['heavy_modules']) or 'нет'}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"Baseline сохранён в {args.baseline}")
+        return 0
+
+    regressions = []
+    # Для обычного (ленивого) режима тяжёлые модули не должны попадать в импорт воркера — даже без baseline
+    if results["lazy"]["heavy_modules"]:
+        regressions.append(f"lazy: при старте импортированы {', '.join(results['lazy']['heavy_modules'])}")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    else:
+        print(f"Baseline {args.baseline} не найден, сравнение времени и RSS пропущено (запустите с --save-baseline)")
+    for mode, result in results.items():
+        for metric in ("import_seconds", "rss_mb"):
+            old = baseline.get(mode, {}).get(metric)
+            if old and result[metric] > old * (1 + args.threshold):
+                regressions.append(f"{mode}.{metric}: {old:.3f} -> {result[metric]:.3f}")
+    for regression in regressions:
+        print(f"РЕГРЕССИЯ {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
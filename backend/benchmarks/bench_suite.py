@@ -0,0 +1,416 @@
+"""
+Набор микробенчмарков горячих путей интервью и отчётов на SQLite-фикстурах
+трёх масштабов: 100, 10 000 и 100 000 кандидатов.
+
+Запуск из каталога backend:
+    python benchmarks/bench_suite.py                        # все бенчмарки, сравнение с baseline
+    python benchmarks/bench_suite.py --scales 100,10000     # только указанные масштабы
+    python benchmarks/bench_suite.py --only admin_utils     # только бенчмарки, в имени которых есть подстрока
+    python benchmarks/bench_suite.py --save-baseline        # сохранить результаты как baseline
+
+Результаты пишутся в benchmarks/results/suite_latest.json. Код выхода 1, если бенчмарк
+стал медленнее baseline больше порога (--threshold, по умолчанию 20%) или был пропущен.
+По умолчанию запускаются все масштабы; с --max-seconds N бенчмарк пропускается, если
+по меньшим масштабам его время оценивается выше N секунд (пропуск считается провалом).
+Baseline: benchmarks/results/suite_baseline.json (локальный, не коммитится) — снимается
+с --save-baseline по текущему дереву на той же машине, что и последующие сравнения.
+Если его нет, сравнение идёт с эталоном benchmarks/reference_baseline.json из репозитория;
+машина и масштабы эталона записаны в нём, на другой машине порог стоит задавать шире.
+Эталон снят на масштабах 100 и 10 000; бенчмарки, которых в нём нет, не сравниваются.
+"""
+import argparse
+import io
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.gettempdir()}/bench_suite_app.db"
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from models import Base, Candidate, InterviewAnswer
+from interview_logic import InterviewManager, InterviewPlan, default_questions
+from process_metrics import calculate_process_metrics
+from roster_import import import_roster_csv, iter_csv_rows, validate_roster_row
+import admin_utils
+
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+DEFAULT_BASELINE = os.path.join(RESULTS_DIR, "suite_baseline.json")
+# Эталонный baseline в репозитории: используется, если локальный не снят
+REFERENCE_BASELINE = os.path.join(BACKEND_DIR, "benchmarks", "reference_baseline.json")
+DEFAULT_OUTPUT = os.path.join(RESULTS_DIR, "suite_latest.json")
+DEFAULT_SCALES = (100, 10_000, 100_000)
+# Отчёты строятся по одному кандидату: меряем фиксированную выборку на базе каждого масштаба
+REPORT_SAMPLE = 20
+# Короче этого времени замеры слишком шумные, чтобы считать их регрессией
+MIN_COMPARABLE_SECONDS = 0.01
+INSERT_BATCH_SIZE = 10_000
+# Бенчмарки с фиксированным объёмом работы: время почти не зависит от масштаба, оценку не делаем
+FIXED_SIZE_BENCHMARKS = {"report_generator.generate_pdf_report", "report_generator.generate_excel_report"}
+
+PROCESSES = ["Отчётность", "Закупки", "Согласование договоров", "Подбор персонала", "Сверка платежей"]
+ANSWERS_BY_TYPE = {
+    "duration": ["15 минут", "около 40 минут", "2", "1,5 часа", "по-разному"],
+    "frequency": ["3 раза в день", "раз в неделю", "1 раз в месяц", "когда как"],
+    "numeric": ["5", "2 раза", "10", "иногда"],
+    "free_text": [
+        "Получаю письмо от руководителя и открываю задачу в Jira",
+        "Excel, 1С и почта",
+        "Когда отчёт отправлен заказчику",
+    ],
+}
+
+
+class AnswerRow(NamedTuple):
+    candidate_id: int
+    process: str
+    question_number: int
+    question: str
+    answer: str
+    is_valid: bool
+    validator_type: str
+    metric: Optional[str]
+
+
+class Fixture(NamedTuple):
+    scale: int
+    session_factory: Callable
+    candidates: List[Dict[str, Any]]
+    answers: List[AnswerRow]
+    roster_csv: bytes
+    work_dir: str
+
+
+def build_fixture(scale: int, work_dir: str) -> Fixture:
+    """SQLite-база с scale кандидатами: 80% начали интервью, у каждого 1–2 процесса по 6 вопросов"""
+    rng = random.Random(scale)
+    questions = default_questions()
+    engine = create_engine(f"sqlite:///{os.path.join(work_dir, f'bench_{scale}.db')}")
+    Base.metadata.create_all(engine)
+    manager = InterviewManager()
+
+    candidates = []
+    for i in range(scale):
+        processes = rng.sample(PROCESSES, rng.randint(1, 2))
+        candidates.append({"id": i + 1, "full_name": f"Сотрудник {i + 1:06d}", "processes": ", ".join(processes)})
+
+    answers: List[AnswerRow] = []
+    for candidate in candidates:
+        if rng.random() >= 0.8:
+            continue
+        for process in candidate["processes"].split(", "):
+            for number, question in enumerate(questions, start=1):
+                answer = rng.choice(ANSWERS_BY_TYPE[question["type"]])
+                answers.append(AnswerRow(
+                    candidate["id"], process, number, question["text"], answer,
+                    manager.validate_answer(answer, question["text"], question["type"]), question["type"],
+                    question["metric"]
+                ))
+
+    with engine.begin() as conn:
+        for start in range(0, len(candidates), INSERT_BATCH_SIZE):
+            conn.execute(insert(Candidate), candidates[start:start + INSERT_BATCH_SIZE])
+        for start in range(0, len(answers), INSERT_BATCH_SIZE):
+            conn.execute(insert(InterviewAnswer), [
+                {
+                    "candidate_id": row.candidate_id, "process": row.process, "question_number": row.question_number,
+                    "question": f"Процесс: {row.process}\n\n{row.question}", "answer": row.answer,
+                    "is_valid": row.is_valid, "metric": row.metric
+                }
+                for row in answers[start:start + INSERT_BATCH_SIZE]
+            ])
+
+    roster = io.StringIO()
+    roster.write("ФИО;Процессы\n")
+    for candidate in candidates:
+        roster.write(f"{candidate['full_name']};{candidate['processes']}\n")
+    return Fixture(
+        scale, sessionmaker(bind=engine), candidates, answers,
+        roster.getvalue().encode("utf-8"), work_dir
+    )
+
+
+# --- Бенчмарки: принимают фикстуру, возвращают число операций ---
+
+def bench_validate_answer(fixture: Fixture) -> int:
+    manager = InterviewManager()
+    for row in fixture.answers:
+        manager.validate_answer(row.answer, row.question, row.validator_type)
+    return len(fixture.answers)
+
+
+def bench_process_answer(fixture: Fixture) -> int:
+    manager = InterviewManager()
+    questions = default_questions()
+    plans: Dict[str, InterviewPlan] = {}
+    operations = 0
+    for candidate in fixture.candidates:
+        processes = candidate["processes"]
+        if processes not in plans:
+            plans[processes] = InterviewPlan(1, processes.split(", "), questions)
+        name = candidate["full_name"]
+        manager.get_next_question(name, plans[processes].processes, plans[processes])
+        step = manager.get_current_step(name)
+        while step is not None:
+            manager.process_answer(name, "15 минут", step.question, True)
+            operations += 1
+            step = manager.get_current_step(name)
+    return operations
+
+
+def bench_calculate_progress(fixture: Fixture) -> int:
+    manager = InterviewManager()
+    plan = InterviewPlan(1, PROCESSES[:2], default_questions())
+    state = {"plan": plan, "step_index": 0, "valid_answers_count": 0, "processes": plan.processes}
+    steps = len(plan.steps) + 1
+    for i in range(fixture.scale * steps):
+        state["step_index"] = i % steps
+        manager.calculate_progress(state)
+    return fixture.scale * steps
+
+
+def bench_calculate_process_metrics(fixture: Fixture) -> int:
+    groups: Dict[tuple, List[AnswerRow]] = {}
+    for row in fixture.answers:
+        if row.is_valid:
+            groups.setdefault((row.candidate_id, row.process), []).append(row)
+    for answers in groups.values():
+        calculate_process_metrics(answers)
+    return len(groups)
+
+
+def _report_candidate_ids(fixture: Fixture) -> List[int]:
+    candidate_ids = sorted({row.candidate_id for row in fixture.answers})
+    step = max(len(candidate_ids) // REPORT_SAMPLE, 1)
+    return candidate_ids[::step][:REPORT_SAMPLE]
+
+
+def _bench_report(fixture: Fixture, generate, suffix: str) -> int:
+    from report_generator import get_candidate_report_data
+    candidate_ids = _report_candidate_ids(fixture)
+    output_path = os.path.join(fixture.work_dir, f"report{suffix}")
+    db = fixture.session_factory()
+    try:
+        for candidate_id in candidate_ids:
+            generate(get_candidate_report_data(db, candidate_id), output_path)
+    finally:
+        db.close()
+    return len(candidate_ids)
+
+
+def bench_pdf_report(fixture: Fixture) -> int:
+    from report_generator import generate_pdf_report
+    return _bench_report(fixture, generate_pdf_report, ".pdf")
+
+
+def bench_excel_report(fixture: Fixture) -> int:
+    from report_generator import generate_excel_report
+    return _bench_report(fixture, generate_excel_report, ".xlsx")
+
+
+def bench_parse_roster_csv(fixture: Fixture) -> int:
+    _, rows = iter_csv_rows(io.BytesIO(fixture.roster_csv), max_bytes=len(fixture.roster_csv) + 1)
+    count = 0
+    for _, row in rows:
+        validate_roster_row(row)
+        count += 1
+    return count
+
+
+def _admin_utils_bench(func):
+    def bench(fixture: Fixture) -> int:
+        db = fixture.session_factory()
+        try:
+            func(db)
+        finally:
+            db.close()
+        return fixture.scale
+    return bench
+
+
+def bench_import_roster_csv(fixture: Fixture) -> int:
+    # Тот же список повторно: upsert без изменений, база после замера прежняя
+    db = fixture.session_factory()
+    try:
+        import_roster_csv(db, io.BytesIO(fixture.roster_csv), max_bytes=len(fixture.roster_csv) + 1)
+    finally:
+        db.close()
+    return fixture.scale
+
+
+BENCHMARKS: Dict[str, Callable[[Fixture], int]] = {
+    "interview.validate_answer": bench_validate_answer,
+    "interview.process_answer": bench_process_answer,
+    "interview.calculate_progress": bench_calculate_progress,
+    "process_metrics.calculate_process_metrics": bench_calculate_process_metrics,
+    "report_generator.generate_pdf_report": bench_pdf_report,
+    "report_generator.generate_excel_report": bench_excel_report,
+    "roster_import.parse_csv": bench_parse_roster_csv,
+    "admin_utils.get_candidate_statuses": _admin_utils_bench(admin_utils.get_candidate_statuses),
+    "admin_utils.get_admin_stats": _admin_utils_bench(admin_utils.get_admin_stats),
+    "admin_utils.get_analytics_data": _admin_utils_bench(admin_utils.get_analytics_data),
+    "admin_utils.export_candidates_data": _admin_utils_bench(admin_utils.export_candidates_data),
+    "roster_import.import_roster_csv": bench_import_roster_csv,
+}
+
+
+def measure(bench: Callable[[Fixture], int], fixture: Fixture, repeat: int) -> Dict[str, Any]:
+    """Медиана нескольких запусков; долгие (> 1 c) бенчмарки запускаются один раз"""
+    samples = []
+    operations = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operations = bench(fixture)
+        samples.append(time.perf_counter() - start)
+        if samples[0] > 1:
+            break
+    seconds = statistics.median(samples)
+    return {"seconds": seconds, "operations": operations, "us_per_op": seconds / max(operations, 1) * 1e6}
+
+
+def estimate_seconds(results: Dict[str, Dict[str, Any]], name: str, scale: int):
+    """
+    Оценка времени по меньшим масштабам: степенная зависимость по двум ближайшим замерам
+    (так квадратичные пути не недооцениваются), по одному замеру — линейная
+    """
+    measured = sorted(
+        (int(key.rsplit("@", 1)[1]), result["seconds"]) for key, result in results.items()
+        if key.rsplit("@", 1)[0] == name and "seconds" in result
+    )
+    measured = [(s, seconds) for s, seconds in measured if s < scale and seconds > 0]
+    if not measured:
+        return None
+    exponent = 1.0
+    if len(measured) >= 2:
+        (scale_a, seconds_a), (scale_b, seconds_b) = measured[-2:]
+        exponent = max(1.0, math.log(seconds_b / seconds_a) / math.log(scale_b / scale_a))
+    previous_scale, seconds = measured[-1]
+    return seconds * (scale / previous_scale) ** exponent
+
+
+def skipped(results: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Пропущенные бенчмарки: масштаб не измерен, поэтому прогон не считается успешным"""
+    return [f"{key}: пропущен ({result['skipped']})" for key, result in results.items() if "skipped" in result]
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float) -> List[str]:
+    regressions = skipped(results)
+    for key, result in results.items():
+        old = baseline.get(key, {}).get("seconds")
+        new = result.get("seconds")
+        if old is None or new is None or max(old, new) < MIN_COMPARABLE_SECONDS:
+            continue
+        if new > old * (1 + threshold):
+            regressions.append(f"{key}: {old:.4f} c -> {new:.4f} c (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default=",".join(str(s) for s in DEFAULT_SCALES))
+    parser.add_argument("--only", default="", help="подстрока имени бенчмарка")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-seconds", type=float, default=0.0,
+                        help="пропускать бенчмарки с оценкой времени выше N секунд (0 — без ограничения)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.20)
+    args = parser.parse_args()
+
+    scales = [int(s) for s in args.scales.split(",") if s.strip()]
+    benchmarks = {name: bench for name, bench in BENCHMARKS.items() if args.only in name}
+    results: Dict[str, Dict[str, Any]] = {}
+    work_dir = tempfile.mkdtemp(prefix="bench_suite_")
+    try:
+        for scale in sorted(scales):
+            start = time.perf_counter()
+            fixture = build_fixture(scale, work_dir)
+            print(f"\nМасштаб {scale}: кандидатов {len(fixture.candidates)}, ответов {len(fixture.answers)} "
+                  f"(фикстура {time.perf_counter() - start:.1f} c)")
+            for name, bench in benchmarks.items():
+                key = f"{name}@{scale}"
+                estimate = None if name in FIXED_SIZE_BENCHMARKS else estimate_seconds(results, name, scale)
+                if args.max_seconds > 0 and estimate is not None and estimate > args.max_seconds:
+                    results[key] = {"skipped": f"оценка {estimate:.1f} c > {args.max_seconds:g} c"}
+                    print(f"  {name:<45} пропущен: {results[key]['skipped']}")
+                    continue
+                results[key] = measure(bench, fixture, args.repeat)
+                print(f"  {name:<45} {results[key]['seconds']:9.4f} c  {results[key]['us_per_op']:12.2f} мкс/оп")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "scales": sorted(scales),
+        "repeat": args.repeat,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nРезультаты сохранены в {args.output}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        # Новые замеры дополняют baseline: запуск по части бенчмарков не стирает остальные
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f).get("results", {})
+        baseline.update({key: result for key, result in results.items() if "seconds" in result})
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({**report, "results": baseline}, f, indent=2, ensure_ascii=False)
+        print(f"Baseline сохранён в {args.baseline}")
+        failures = skipped(results)
+        for failure in failures:
+            print(f"НЕ ИЗМЕРЕН {failure}")
+        return 1 if failures else 0
+
+    baseline_path = args.baseline
+    if not os.path.exists(baseline_path) and baseline_path == DEFAULT_BASELINE:
+        baseline_path = REFERENCE_BASELINE
+    if not os.path.exists(baseline_path):
+        print(f"Baseline {args.baseline} не найден, сравнение пропущено (запустите с --save-baseline)")
+        failures = skipped(results)
+        for failure in failures:
+            print(f"НЕ ИЗМЕРЕН {failure}")
+        return 1 if failures else 0
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline_report = json.load(f)
+    baseline = baseline_report.get("results", {})
+    print(f"Сравнение с {baseline_path} ({baseline_report.get('platform')}, CPU {baseline_report.get('cpu_count')}, "
+          f"снят {baseline_report.get('created_at')})")
+    if baseline_report.get("platform") != report["platform"] or baseline_report.get("cpu_count") != report["cpu_count"]:
+        print("Baseline снят на другой машине: сравнение ориентировочное, при необходимости увеличьте --threshold")
+    missing = [key for key, result in results.items() if "seconds" in result and key not in baseline]
+    if missing:
+        print(f"Нет в baseline, не сравниваются: {', '.join(missing)}")
+    regressions = compare(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"РЕГРЕССИЯ {regression}")
+    if not regressions:
+        print(f"Регрессий больше {args.threshold * 100:.0f}% нет")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,44 +1,60 @@
-import pandas as pd
+import hashlib
 import os
 from sqlalchemy.orm import Session
 from models import Candidate
+from roster_import import import_roster_file
+from app_metadata import get_metadata, set_metadata
 
-def load_candidates_from_csv(db: Session, csv_path: str = "uploads/candidates.csv"):
-    """Загружает кандидатов из CSV файла в базу данных"""
+# Файл со списком кандидатов для загрузки при старте (CSV или XLSX)
+ROSTER_SEED_FILE = os.getenv("ROSTER_SEED_FILE", "uploads/candidates.csv")
+ROSTER_SEED_METADATA_KEY = "roster_seed"
+
+def file_sha256(path: str) -> str:
+    """Считает SHA-256 файла, читая его по частям"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_candidates_from_csv(db: Session, csv_path: str = ROSTER_SEED_FILE):
+    """
+    Загружает кандидатов из CSV или XLSX файла в базу данных.
+    Если файл не менялся с прошлой загрузки (хеш совпадает), ничего не делает;
+    иначе добавляет новых и обновляет существующих кандидатов, не удаляя их.
+    """
     try:
         if not os.path.exists(csv_path):
-            print(f"CSV файл {csv_path} не найден")
+            print(f"Файл кандидатов {csv_path} не найден")
             return False
-            
-        # Читаем CSV файл
-        df = pd.read_csv(csv_path, encoding='utf-8')
         
-        # Проверяем наличие необходимых колонок
-        if 'ФИО' not in df.columns or 'Процессы' not in df.columns:
-            print("CSV файл должен содержать колонки 'ФИО' и 'Процессы'")
-            return False
+        content_hash = file_sha256(csv_path)
+        seed = get_metadata(db, ROSTER_SEED_METADATA_KEY)
+        if seed and seed.get("content_hash") == content_hash:
+            print(f"Файл кандидатов {csv_path} не изменился ({seed.get('row_count')} строк), загрузка пропущена")
+            return True
         
-        # Очищаем существующие данные
-        db.query(Candidate).delete()
+        # Тот же потоковый путь, что и при загрузке через админку
+        with open(csv_path, "rb") as f:
+            summary = import_roster_file(db, f, csv_path)
         
-        # Добавляем новые данные
-        for _, row in df.iterrows():
-            full_name = str(row['ФИО']).strip()
-            processes = str(row['Процессы']).strip() if pd.notna(row['Процессы']) else ""
-            
-            if full_name:  # Пропускаем пустые строки
-                candidate = Candidate(
-                    full_name=full_name,
-                    processes=processes
-                )
-                db.add(candidate)
+        for error in summary["errors"]:
+            print(f"Строка {error['line']} пропущена: {error['error']}")
         
+        set_metadata(db, ROSTER_SEED_METADATA_KEY, {
+            "path": csv_path,
+            "content_hash": content_hash,
+            "row_count": summary["rows"]
+        })
         db.commit()
-        print(f"Успешно загружено {len(df)} кандидатов из CSV файла")
+        print(
+            f"Файл кандидатов {csv_path} загружен: добавлено {summary['created']}, "
+            f"обновлено {summary['updated']}"
+        )
         return True
         
     except Exception as e:
-        print(f"Ошибка при загрузке CSV файла: {e}")
+        print(f"Ошибка при загрузке файла кандидатов: {e}")
         db.rollback()
         return False
 
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Tuple
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import Integer, String, cast, select, text, update
+from sqlalchemy.orm import Session
+
+import metrics
+from app_metadata import get_metadata, set_metadata
+from models import AppMetadata, data_generation_seq
+
+DATA_GENERATION_KEY = "data_generation"
+
+
+def _uses_sequence(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def bump_data_generation(db: Session):
+    """
+    Увеличивает счётчик поколения данных. Вызывается ПОСЛЕ commit записи, видимой в админке
+    (ответы, загрузка списка, архивирование, сводки по процессам), и сам фиксирует увеличение.
+    Так запись ответа не ждёт общую строку счётчика, а версия меняется, когда данные уже видны:
+    чтение между commit и увеличением в худшем случае закэширует новые данные под старой версией.
+    Ошибка увеличения не пробрасывается — данные уже записаны, повтор запроса их бы задублировал.
+    """
+    try:
+        if _uses_sequence(db):
+            # nextval не транзакционный и не берёт блокировок строк
+            db.execute(select(data_generation_seq.next_value()))
+        else:
+            result = db.execute(
+                update(AppMetadata)
+                .where(AppMetadata.key == DATA_GENERATION_KEY)
+                .values(value=cast(cast(AppMetadata.value, Integer) + 1, String))
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 0:
+                set_metadata(db, DATA_GENERATION_KEY, 1)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        metrics.increment("data_generation_bump_failed")
+        print(f"Не удалось обновить версию данных админки: {e}")
+
+
+def get_data_version(db: Session) -> str:
+    """
+    Версия данных админки — счётчик поколения (последовательность PostgreSQL или строка app_metadata).
+    Счётчик общий для всех воркеров и меняется после каждой записи, поэтому зафиксированная
+    запись, даже с меньшим id, чем уже видимые, всегда меняет версию.
+    """
+    if _uses_sequence(db):
+        last_value, is_called = db.execute(text("SELECT last_value, is_called FROM data_generation_seq")).one()
+        generation = last_value if is_called else 0
+    else:
+        generation = get_metadata(db, DATA_GENERATION_KEY) or 0
+    return hashlib.sha1(str(generation).encode()).hexdigest()[:16]
+
+
+class VersionedResponseCache:
+    """Кэш сериализованных ответов: по каждому ключу хранится только последняя версия"""
+
+    def __init__(self):
+        self._items: Dict[str, Tuple[str, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, version: str):
+        with self._lock:
+            item = self._items.get(key)
+        if item is not None and item[0] == version:
+            return item[1]
+        return None
+
+    def put(self, key: str, version: str, body: bytes):
+        with self._lock:
+            self._items[key] = (version, body)
+
+
+response_cache = VersionedResponseCache()
+
+
+def versioned_json_response(request: Request, db: Session, key: str, compute: Callable[[], Any]) -> Response:
+    """
+    Отдаёт JSON с ETag по версии данных: 304 при совпадении If-None-Match,
+    иначе ответ из кэша процесса или результат compute().
+    """
+    version = get_data_version(db)
+    etag = f'"{key}-{version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if etag in request.headers.get("if-none-match", ""):
+        metrics.increment("admin_cache_not_modified")
+        return Response(status_code=304, headers=headers)
+
+    body = response_cache.get(key, version)
+    if body is None:
+        metrics.increment("admin_cache_misses")
+        body = json.dumps(jsonable_encoder(compute()), ensure_ascii=False).encode("utf-8")
+        response_cache.put(key, version, body)
+    else:
+        metrics.increment("admin_cache_hits")
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,16 +1,159 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
 from models import Base
 import os
+import threading
+import time
+
+import metrics
 
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://user:password@db:5432/deepinterview")
+# Необязательная реплика только для чтения: на неё уходят тяжёлые админские чтения и отчёты
+READ_REPLICA_URL = os.getenv("READ_REPLICA_URL", "")
+# Допустимое отставание реплики; при большем отставании чтения идут на основную базу
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "30"))
+# Как часто перепроверять доступность и отставание реплики
+REPLICA_CHECK_INTERVAL_SECONDS = float(os.getenv("REPLICA_CHECK_INTERVAL_SECONDS", "5"))
 
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Отставание реплики PostgreSQL: 0, если всё полученное уже применено (или это не реплика),
+# иначе время с последней применённой транзакции
+POSTGRES_REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+def _create_replica_engine(url: str):
+    connect_args = {"connect_timeout": 2} if url.startswith("postgresql") else {}
+    return create_engine(url, pool_pre_ping=True, connect_args=connect_args)
+
+
+replica_engine = _create_replica_engine(READ_REPLICA_URL) if READ_REPLICA_URL else None
+
+
+class ReplicaRouter:
+    """
+    Решает, можно ли читать с реплики: реплика доступна и отстаёт не больше max_lag секунд.
+    Результат проверки кэшируется на check_interval секунд, чтобы не проверять на каждый запрос.
+    """
+
+    def __init__(self, replica, max_lag: float = REPLICA_MAX_LAG_SECONDS,
+                 check_interval: float = REPLICA_CHECK_INTERVAL_SECONDS):
+        self.replica = replica
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.usable = False
+        self.lag = None
+        self.error = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _measure_lag(self) -> float:
+        with self.replica.connect() as conn:
+            if self.replica.dialect.name == "postgresql":
+                return float(conn.execute(POSTGRES_REPLICA_LAG_SQL).scalar() or 0)
+            # Для других СУБД отставание не измерить — проверяем только доступность
+            conn.execute(text("SELECT 1"))
+            return 0.0
+
+    def replica_usable(self) -> bool:
+        if self.replica is None:
+            return False
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return self.usable
+        with self._lock:
+            if now - self._checked_at < self.check_interval:
+                return self.usable
+            try:
+                self.lag = self._measure_lag()
+                self.error = None
+                self.usable = self.lag <= self.max_lag
+                metrics.set_gauge("replica_lag_seconds", self.lag)
+            except Exception as e:
+                if self.usable or self.error is None:
+                    print(f"Реплика недоступна, чтения идут на основную базу: {e}")
+                self.lag = None
+                self.error = str(e)
+                self.usable = False
+            self._checked_at = time.monotonic()
+            return self.usable
+
+    def mark_unusable(self, error: Exception):
+        """Реплика отказала на запросе: до следующей проверки чтения идут на основную базу"""
+        with self._lock:
+            if self.usable:
+                print(f"Ошибка запроса к реплике, чтения идут на основную базу: {error}")
+            self.usable = False
+            self.lag = None
+            self.error = str(error)
+            self._checked_at = time.monotonic()
+
+    def status(self):
+        if self.replica is None:
+            return {"configured": False}
+        return {"configured": True, "usable": self.replica_usable(), "lag_seconds": self.lag, "error": self.error}
+
+
+replica_router = ReplicaRouter(replica_engine)
+
+
+class ReplicaReadSession(Session):
+    """
+    Сессия чтения с реплики. Если реплика отказала между проверками (OperationalError),
+    она помечается недоступной, а запрос повторяется на основной базе — сессия переключается на неё
+    """
+
+    def _with_primary_fallback(self, method, *args, **kwargs):
+        try:
+            return method(*args, **kwargs)
+        except OperationalError as e:
+            if self.bind is not replica_engine:
+                raise
+            replica_router.mark_unusable(e)
+            self.rollback()
+            self.bind = engine
+            metrics.increment("db_reads_primary_retry")
+            return method(*args, **kwargs)
+
+    def execute(self, *args, **kwargs):
+        return self._with_primary_fallback(super().execute, *args, **kwargs)
+
+    def scalar(self, *args, **kwargs):
+        return self._with_primary_fallback(super().scalar, *args, **kwargs)
+
+    def scalars(self, *args, **kwargs):
+        return self._with_primary_fallback(super().scalars, *args, **kwargs)
+
+
+ReplicaSessionLocal = sessionmaker(
+    class_=ReplicaReadSession, autocommit=False, autoflush=False, bind=replica_engine
+) if replica_engine else None
+
+
+# Столбцы, добавленные в существующие таблицы после их создания: create_all их не добавляет
+ADDED_COLUMNS = [
+    ("interview_answers", "metric", "VARCHAR(32)"),
+    ("candidates", "interview_completed_at", "TIMESTAMP WITH TIME ZONE"),
+]
+
+
 def create_tables():
-    """Создает все таблицы в базе данных"""
+    """Создает все таблицы в базе данных и недостающие столбцы в уже существующих"""
     Base.metadata.create_all(bind=engine)
+    existing = {}
+    with engine.begin() as conn:
+        for table, column, column_type in ADDED_COLUMNS:
+            if table not in existing:
+                existing[table] = {c["name"] for c in inspect(conn).get_columns(table)}
+            if column not in existing[table]:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+                print(f"Добавлен столбец {table}.{column}")
 
 def get_db():
     """Возвращает сессию базы данных"""
@@ -19,3 +162,23 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def read_session():
+    """
+    Сессия только для чтения: реплика, если она настроена, доступна и отстаёт не больше
+    REPLICA_MAX_LAG_SECONDS, иначе основная база
+    """
+    if replica_router.replica_usable():
+        metrics.increment("db_reads_replica")
+        return ReplicaSessionLocal()
+    if replica_engine is not None:
+        metrics.increment("db_reads_primary_fallback")
+    return SessionLocal()
+
+def get_read_db():
+    """Возвращает сессию для тяжёлых чтений (админка, отчёты, выгрузки) — с реплики, если можно"""
+    db = read_session()
+    try:
+        yield db
+    finally:
+        db.close()
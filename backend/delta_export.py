@@ -0,0 +1,205 @@
+import base64
+import json
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+import metrics
+from app_metadata import set_metadata
+from models import AppMetadata, Candidate, InterviewAnswer
+
+# Инкрементальная выгрузка для синхронизации с хранилищем: только кандидаты и ответы,
+# появившиеся или изменённые после курсора. Курсор — непрозрачная строка (base64 JSON).
+DELTA_EXPORT_BATCH_SIZE = 1000
+# Изменения моложе этого числа секунд не выгружаются: транзакции, начатые раньше, успевают
+# зафиксироваться, и следующий курсор не «перепрыгивает» через ещё не видимые строки
+DELTA_EXPORT_SETTLE_SECONDS = int(os.getenv("DELTA_EXPORT_SETTLE_SECONDS", "5"))
+# Сколько держать водяной знак у начала долгой записи (импорт списка кандидатов).
+# Отметка старше этого считается оставшейся после падения процесса и не учитывается.
+DELTA_EXPORT_HOLD_MAX_SECONDS = int(os.getenv("DELTA_EXPORT_HOLD_MAX_SECONDS", "3600"))
+DELTA_HOLD_KEY_PREFIX = "delta_hold:"
+CURSOR_VERSION = 1
+
+
+class DeltaCursor(NamedTuple):
+    """Водяные знаки синхронизации: последний выгруженный id ответа и момент изменений кандидатов"""
+    answer_id: int
+    candidates_changed_at: Optional[datetime]
+
+
+class DeltaBounds(NamedTuple):
+    """Диапазон одной выгрузки: (since, until] по кандидатам и (since, until] по id ответов"""
+    since: DeltaCursor
+    until: DeltaCursor
+
+
+def encode_cursor(cursor: DeltaCursor) -> str:
+    data = {
+        "v": CURSOR_VERSION,
+        "a": cursor.answer_id,
+        "c": cursor.candidates_changed_at.isoformat() if cursor.candidates_changed_at else None
+    }
+    return base64.urlsafe_b64encode(json.dumps(data, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(value: Optional[str]) -> DeltaCursor:
+    """Разбирает курсор клиента; пустой курсор — выгрузка с начала. ValueError при неверном курсоре."""
+    if not value:
+        return DeltaCursor(answer_id=0, candidates_changed_at=None)
+    try:
+        data = json.loads(base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)))
+        if data.get("v") != CURSOR_VERSION:
+            raise ValueError("версия")
+        changed_at = datetime.fromisoformat(data["c"]) if data.get("c") else None
+        return DeltaCursor(answer_id=int(data["a"]), candidates_changed_at=changed_at)
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        raise ValueError(f"Неверный курсор выгрузки: {e}")
+
+
+def _candidate_changed_at():
+    return func.coalesce(Candidate.updated_at, Candidate.created_at)
+
+
+def hold_delta_watermark(db: Session) -> str:
+    """
+    Отмечает начало долгой транзакции записи (commit сразу, до её начала).
+
+    На Postgres now() — время начала транзакции, поэтому импорт, который идёт дольше
+    окна DELTA_EXPORT_SETTLE_SECONDS, записывает updated_at позади уже выданного курсора.
+    Пока отметка есть, курсор кандидатов не продвигается дальше её начала.
+    """
+    token = uuid.uuid4().hex
+    set_metadata(db, DELTA_HOLD_KEY_PREFIX + token, {"started_at": datetime.now(timezone.utc).isoformat()})
+    db.commit()
+    return token
+
+
+def release_delta_watermark(db: Session, token: str):
+    """Снимает отметку после commit или rollback долгой транзакции"""
+    try:
+        db.query(AppMetadata).filter(AppMetadata.key == DELTA_HOLD_KEY_PREFIX + token).delete()
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        # Отметка перестанет учитываться через DELTA_EXPORT_HOLD_MAX_SECONDS
+        print(f"Не удалось снять отметку инкрементальной выгрузки {token}: {e}")
+
+
+def _oldest_open_write(db: Session, now: datetime) -> Optional[datetime]:
+    """Начало самой старой незавершённой долгой записи (без отметок, оставшихся после падения)"""
+    oldest = None
+    rows = db.query(AppMetadata.value).filter(AppMetadata.key.like(DELTA_HOLD_KEY_PREFIX + "%")).all()
+    for (value,) in rows:
+        started_at = datetime.fromisoformat(json.loads(value)["started_at"])
+        if now - started_at > timedelta(seconds=DELTA_EXPORT_HOLD_MAX_SECONDS):
+            continue
+        if oldest is None or started_at < oldest:
+            oldest = started_at
+    return oldest
+
+
+def prepare_delta_export(db: Session, since: DeltaCursor) -> DeltaBounds:
+    """
+    Фиксирует верхнюю границу выгрузки заранее, чтобы следующий курсор был известен
+    до начала потоковой отдачи (и попал в заголовок ответа).
+    """
+    now = datetime.now(timezone.utc)
+    settled_at = now - timedelta(seconds=DELTA_EXPORT_SETTLE_SECONDS)
+    open_write = _oldest_open_write(db, now)
+    if open_write is not None:
+        # Строки незавершённого импорта получат время изменения не раньше его начала
+        settled_at = min(settled_at, open_write - timedelta(seconds=DELTA_EXPORT_SETTLE_SECONDS))
+    if since.candidates_changed_at is not None and since.candidates_changed_at >= settled_at:
+        settled_at = since.candidates_changed_at
+    max_answer_id = db.execute(
+        select(func.max(InterviewAnswer.id)).where(
+            InterviewAnswer.id > since.answer_id,
+            InterviewAnswer.created_at <= settled_at
+        )
+    ).scalar()
+    return DeltaBounds(
+        since=since,
+        until=DeltaCursor(answer_id=max_answer_id or since.answer_id, candidates_changed_at=settled_at)
+    )
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _ndjson(records: List[Dict[str, Any]]) -> bytes:
+    return "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+
+
+def stream_delta_export(db: Session, bounds: DeltaBounds, batch_size: int = DELTA_EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """
+    NDJSON: сначала изменённые кандидаты, затем новые ответы, последней строкой — следующий курсор.
+    Объём работы пропорционален числу изменений: кандидаты выбираются по времени изменения,
+    ответы — по диапазону первичного ключа.
+    """
+    changed_at = _candidate_changed_at()
+    candidates_query = (
+        select(Candidate.id, Candidate.full_name, Candidate.processes, Candidate.created_at, Candidate.updated_at)
+        .where(changed_at <= bounds.until.candidates_changed_at)
+        .order_by(Candidate.id)
+        .execution_options(stream_results=True, yield_per=batch_size)
+    )
+    if bounds.since.candidates_changed_at is not None:
+        candidates_query = candidates_query.where(changed_at > bounds.since.candidates_changed_at)
+
+    candidates_count = 0
+    for partition in db.execute(candidates_query).partitions():
+        candidates_count += len(partition)
+        yield _ndjson([
+            {
+                "type": "candidate",
+                "id": row.id,
+                "full_name": row.full_name,
+                "processes": row.processes or "",
+                "created_at": _iso(row.created_at),
+                "updated_at": _iso(row.updated_at)
+            }
+            for row in partition
+        ])
+
+    answers_count = 0
+    if bounds.until.answer_id > bounds.since.answer_id:
+        answers_query = (
+            select(
+                InterviewAnswer.id, InterviewAnswer.candidate_id, InterviewAnswer.process,
+                InterviewAnswer.question_number, InterviewAnswer.metric, InterviewAnswer.question, InterviewAnswer.answer,
+                InterviewAnswer.is_valid, InterviewAnswer.created_at
+            )
+            .where(InterviewAnswer.id > bounds.since.answer_id, InterviewAnswer.id <= bounds.until.answer_id)
+            .order_by(InterviewAnswer.id)
+            .execution_options(stream_results=True, yield_per=batch_size)
+        )
+        for partition in db.execute(answers_query).partitions():
+            answers_count += len(partition)
+            yield _ndjson([
+                {
+                    "type": "answer",
+                    "id": row.id,
+                    "candidate_id": row.candidate_id,
+                    "process": row.process,
+                    "question_number": row.question_number,
+                    "metric": row.metric,
+                    "question": row.question,
+                    "answer": row.answer,
+                    "is_valid": row.is_valid,
+                    "created_at": _iso(row.created_at)
+                }
+                for row in partition
+            ])
+
+    metrics.increment("delta_export_candidates", candidates_count)
+    metrics.increment("delta_export_answers", answers_count)
+    yield _ndjson([{
+        "type": "cursor",
+        "next_cursor": encode_cursor(bounds.until),
+        "candidates": candidates_count,
+        "answers": answers_count
+    }])
@@ -0,0 +1,67 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Tuple
+
+# Сколько живут сохранённые ответы для повторов запроса
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "300"))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+
+
+class IdempotencyCache:
+    """Кэш ответов по ключу идемпотентности с ограничением по времени и размеру"""
+
+    def __init__(self, ttl: int = IDEMPOTENCY_TTL_SECONDS, max_size: int = IDEMPOTENCY_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._items: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, scope: str, key: str) -> Optional[Any]:
+        """Возвращает сохранённый ответ или None"""
+        with self._lock:
+            item = self._items.get((scope, key))
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._items[(scope, key)]
+                return None
+            return value
+
+    def put(self, scope: str, key: str, value: Any):
+        """Сохраняет ответ; самые старые записи вытесняются"""
+        with self._lock:
+            self._items[(scope, key)] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end((scope, key))
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+
+class KeyedLocks:
+    """asyncio-блокировки по ключу (например, по ФИО кандидата); неиспользуемые удаляются"""
+
+    def __init__(self):
+        self._locks: Dict[str, list] = {}  # ключ -> [lock, число ожидающих]
+
+    @asynccontextmanager
+    async def hold(self, key: str):
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._locks.pop(key, None)
+
+
+# Глобальные экземпляры для /api/chat
+chat_responses = IdempotencyCache()
+candidate_locks = KeyedLocks()
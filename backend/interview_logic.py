@@ -1,5 +1,6 @@
-from typing import List, Dict, Tuple
-import re
+from typing import List, Dict, Tuple, NamedTuple, Optional, Any
+from answer_rules import load_rules
+from process_metrics import LEGACY_QUESTION_METRICS
 
 # Список подбадриваний
 ENCOURAGEMENTS = [
@@ -18,59 +19,111 @@ INTERVIEW_QUESTIONS = [
     "Какие программы или инструменты вы используете?"
 ]
 
+# Правила валидации ответов компилируются один раз при старте
+answer_rules = load_rules(INTERVIEW_QUESTIONS)
+
+INTERVIEW_COMPLETED_MESSAGE = "Ваше интервью завершено! Спасибо за участие!"
+
+
+class PlanStep(NamedTuple):
+    """Один шаг плана интервью"""
+    process: str
+    process_index: int
+    question_index: int
+    question: str
+    validator_type: str
+    prompt: str
+    metric: Optional[str] = None
+
+
+class InterviewPlan:
+    """Заранее собранный план интервью кандидата: плоская последовательность вопросов и прогресс"""
+
+    def __init__(self, version: int, processes: List[str], questions: List[Dict[str, Any]]):
+        self.version = version
+        self.processes = list(processes)
+        self.steps: List[PlanStep] = []
+        weights: List[float] = []
+        for process_index, process in enumerate(self.processes):
+            for question_index, item in enumerate(questions):
+                self.steps.append(PlanStep(
+                    process=process,
+                    process_index=process_index,
+                    question_index=question_index,
+                    question=item["text"],
+                    validator_type=item.get("type") or answer_rules.get_question_type(item["text"]),
+                    prompt=f"Процесс: {process}\n\n{item['text']}",
+                    metric=item.get("metric")
+                ))
+                weights.append(float(item.get("weight", 1.0)))
+
+        # progress[i] — процент завершения перед шагом i; progress[len(steps)] == 100
+        total = sum(weights)
+        self.progress: List[int] = []
+        completed = 0.0
+        for weight in weights:
+            self.progress.append(min(int((completed / total) * 100), 100) if total > 0 else 0)
+            completed += weight
+        self.progress.append(100)
+
+
+def default_questions() -> List[Dict[str, Any]]:
+    """Банк вопросов по умолчанию (из INTERVIEW_QUESTIONS)"""
+    return [
+        {
+            "text": question,
+            "type": answer_rules.get_question_type(question),
+            "weight": 1.0,
+            "metric": LEGACY_QUESTION_METRICS.get(number)
+        }
+        for number, question in enumerate(INTERVIEW_QUESTIONS, start=1)
+    ]
+
+
 class InterviewManager:
     def __init__(self):
         self.interview_states = {}  # Хранит состояние интервью для каждого пользователя
     
-    def validate_answer(self, answer: str, question: str) -> bool:
+    def validate_answer(self, answer: str, question: str, validator_type: Optional[str] = None) -> bool:
         """Проверяет валидность ответа пользователя"""
-        answer_lower = answer.lower()
-        
-        # Проверяем на неопределенные слова
-        vague_words = ["иногда", "по-разному", "обычно", "когда как"]
-        if any(word in answer_lower for word in vague_words):
-            return False
-        
-        # Проверяем наличие цифр для вопросов про время или частоту
-        time_questions = ["время", "минут", "часто", "раз", "сессию"]
-        if any(word in question.lower() for word in time_questions):
-            # Ищем цифры в ответе
-            if not re.search(r'\d+', answer):
-                return False
-        
-        return True
+        if validator_type is not None:
+            return answer_rules.validate_typed(answer, validator_type)
+        return answer_rules.validate(answer, question)
     
-    def get_clarification_question(self, question: str) -> str:
+    def get_clarification_question(self, question: str, validator_type: Optional[str] = None) -> str:
         """Возвращает уточняющий вопрос"""
-        if any(word in question.lower() for word in ["время", "минут", "часто", "раз", "сессию"]):
-            return "Пожалуйста, уточните точнее (в минутах или количестве)."
-        return "Пожалуйста, уточните ваш ответ более конкретно."
+        if validator_type is not None:
+            return answer_rules.get_typed_clarification(validator_type)
+        return answer_rules.get_clarification(question)
     
-    def get_next_question(self, full_name: str, processes: List[str]) -> Tuple[str, int, int]:
-        """Возвращает следующий вопрос для пользователя"""
+    def get_next_question(self, full_name: str, processes: List[str],
+                          plan: Optional[InterviewPlan] = None) -> Tuple[str, int, int]:
+        """Возвращает следующий вопрос для пользователя (план строится один раз, при первом сообщении)"""
         if full_name not in self.interview_states:
             self.interview_states[full_name] = {
-                'current_process_index': 0,
-                'current_question_index': 0,
+                'plan': plan or InterviewPlan(0, processes, default_questions()),
+                'step_index': 0,
                 'valid_answers_count': 0,
                 'processes': processes
             }
         
-        state = self.interview_states[full_name]
-        process_index = state['current_process_index']
-        question_index = state['current_question_index']
+        step = self.get_current_step(full_name)
         
         # Если все процессы завершены
-        if process_index >= len(processes):
+        if step is None:
             return "Интервью завершено", 100, 0
         
-        current_process = processes[process_index]
-        current_question = INTERVIEW_QUESTIONS[question_index]
-        
-        # Формируем вопрос с указанием текущего процесса
-        formatted_question = f"Процесс: {current_process}\n\n{current_question}"
-        
-        return formatted_question, process_index, question_index
+        return step.prompt, step.process_index, step.question_index
+    
+    def get_current_step(self, full_name: str) -> Optional[PlanStep]:
+        """Возвращает текущий шаг плана (None, если интервью завершено или не начато)"""
+        state = self.interview_states.get(full_name)
+        if state is None:
+            return None
+        steps = state['plan'].steps
+        if state['step_index'] >= len(steps):
+            return None
+        return steps[state['step_index']]
     
     def process_answer(self, full_name: str, answer: str, question: str, is_valid: bool) -> Tuple[str, int]:
         """Обрабатывает ответ пользователя и возвращает следующий шаг"""
@@ -81,26 +134,22 @@ class InterviewManager:
         
         if not is_valid:
             # Возвращаем уточняющий вопрос
-            clarification = self.get_clarification_question(question)
+            step = self.get_current_step(full_name)
+            clarification = self.get_clarification_question(question, step.validator_type if step else None)
             return clarification, self.calculate_progress(state)
         
         # Увеличиваем счетчик валидных ответов
         state['valid_answers_count'] += 1
         
-        # Переходим к следующему вопросу
-        state['current_question_index'] += 1
-        
-        # Если вопросы по текущему процессу закончились
-        if state['current_question_index'] >= len(INTERVIEW_QUESTIONS):
-            state['current_question_index'] = 0
-            state['current_process_index'] += 1
+        # Переходим к следующему шагу плана
+        state['step_index'] += 1
         
         # Если все процессы завершены
-        if state['current_process_index'] >= len(state['processes']):
-            return "Ваше интервью завершено! Спасибо за участие!", 100
+        next_step = self.get_current_step(full_name)
+        if next_step is None:
+            return INTERVIEW_COMPLETED_MESSAGE, 100
         
-        # Получаем следующий вопрос
-        next_question, _, _ = self.get_next_question(full_name, state['processes'])
+        next_question = next_step.prompt
         
         # Добавляем подбадривание каждые 3 валидных ответа
         if state['valid_answers_count'] % 3 == 0 and state['valid_answers_count'] > 0:
@@ -111,21 +160,14 @@ class InterviewManager:
         return next_question, progress
     
     def calculate_progress(self, state: Dict) -> int:
-        """Вычисляет процент завершения интервью"""
-        total_questions = len(state['processes']) * len(INTERVIEW_QUESTIONS)
-        completed_questions = state['current_process_index'] * len(INTERVIEW_QUESTIONS) + state['current_question_index']
-        return min(int((completed_questions / total_questions) * 100), 100)
+        """Вычисляет процент завершения интервью (веса заранее посчитаны в плане)"""
+        progress = state['plan'].progress
+        return progress[min(state['step_index'], len(progress) - 1)]
     
     def get_current_process(self, full_name: str) -> str:
         """Возвращает текущий процесс"""
-        if full_name not in self.interview_states:
-            return ""
-        
-        state = self.interview_states[full_name]
-        if state['current_process_index'] >= len(state['processes']):
-            return ""
-        
-        return state['processes'][state['current_process_index']]
+        step = self.get_current_step(full_name)
+        return step.process if step else ""
 
 # Глобальный экземпляр менеджера интервью
 interview_manager = InterviewManager()
@@ -1,31 +1,70 @@
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Body
+from fastapi import FastAPI, Depends, HTTPException, Body, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse, FileResponse
+from starlette.background import BackgroundTask
+from starlette.datastructures import UploadFile as StarletteUploadFile
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import time
 import io
+import json
+import os
+import importlib
 
-from database import create_tables, get_db
-from models import InterviewAnswer
+from database import create_tables, get_db, get_read_db, read_session, SessionLocal, engine, replica_engine, replica_router
 from schemas import (
     CandidateRegister, CandidateResponse, ChatRequest, ChatResponse,
-    AdminLogin, AdminToken, CandidateStatus, AnalyticsData, AdminStats
+    AdminLogin, AdminToken, CandidateStatus, AnalyticsData, AdminStats,
+    QuestionBankIn, QuestionBankOut, ProcessRollupOut, AnswerSearchPage,
+    AnswerArchiveIn, AnswerArchiveRun, AnswerArchiveOut
 )
 from csv_utils import load_candidates_from_csv, find_candidate_by_name
-from interview_logic import interview_manager
-from interview_logic import INTERVIEW_QUESTIONS
+from interview_logic import interview_manager, INTERVIEW_COMPLETED_MESSAGE
+from rate_limit import public_endpoint_guard, check_name_rate_limit, mark_idempotent_replay
+from idempotency import chat_responses, candidate_locks
+from answer_writer import answer_writer, save_answer, WriteBufferFull
+from question_bank import (
+    ensure_question_bank, get_question_bank, create_question_bank_version, get_interview_plan, with_default_metrics,
+    backfill_answer_metrics
+)
 from auth import authenticate_admin, create_access_token, get_current_admin
 from admin_utils import (
     get_candidate_statuses, get_admin_stats, get_analytics_data,
-    export_candidates_data, update_candidates_from_csv
+    export_candidates_data
+)
+from answer_search import ensure_search_index, search_answers
+from process_catalog import backfill_process_catalog, get_process_rollups, process_rollup_refresher
+from data_version import versioned_json_response
+from answer_export import stream_answers_export, EXPORT_FORMATS
+from answer_archive import archive_answers, backfill_interview_completion, list_archives, mark_interview_completed
+from delta_export import decode_cursor, encode_cursor, prepare_delta_export, stream_delta_export
+from request_profiler import RequestProfilerMiddleware, instrument_engine, profile_store, run_in_threadpool_profiled
+from roster_import import (
+    import_roster_file, is_roster_file, RosterImportError, ROSTER_MAX_UPLOAD_MB, ROSTER_MAX_UPLOAD_BYTES,
+    ROSTER_MULTIPART_OVERHEAD_BYTES
 )
-from report_generator import generate_report_files
-from ai_helper import generate_follow_up  # ✅ важно: импорт наверху, а не внизу
+from ai_helper import generate_follow_up, pick_motivation_phrase, stream_follow_up_tokens  # ✅ важно: импорт наверху, а не внизу
+from prompt_builder import load_encoder
+import metrics
 from pydantic import BaseModel
 
 app = FastAPI(title="DeepInterview API", version="1.0.0")
 
+# Тяжёлые модули (pandas, reportlab, openpyxl, pyarrow) импортируются при первом админском вызове.
+# PRELOAD_HEAVY_MODULES=true загружает их сразу — для запуска через gunicorn --preload,
+# когда воркеры наследуют уже импортированные модули от родительского процесса.
+HEAVY_MODULES = ("pandas", "openpyxl", "pyarrow", "pyarrow.parquet", "report_generator", "summary_report")
+
+
+def preload_heavy_modules():
+    for name in HEAVY_MODULES:
+        importlib.import_module(name)
+
+
+if os.getenv("PRELOAD_HEAVY_MODULES", "false").lower() == "true":
+    preload_heavy_modules()
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -33,8 +72,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Profile-Id", "X-Next-Cursor"],
 )
 
+# Профилирование админских запросов по запросу (X-Profile: 1 / ?profile=1) или по выборке
+app.add_middleware(RequestProfilerMiddleware)
+instrument_engine(engine)
+if replica_engine is not None:
+    instrument_engine(replica_engine)
+
 
 def init_database():
     """Initialize database connection and create tables"""
@@ -44,8 +90,13 @@ def init_database():
     while retry_count < max_retries:
         try:
             create_tables()
+            ensure_search_index(engine)
             db = next(get_db())
             load_candidates_from_csv(db)
+            ensure_question_bank(db)
+            backfill_answer_metrics(db)
+            backfill_process_catalog(db)
+            backfill_interview_completion(db, len(get_question_bank(db)[1]))
             db.close()
             print("✅ Database initialized successfully")
             return True
@@ -62,6 +113,19 @@ def init_database():
 @app.on_event("startup")
 async def startup_event():
     init_database()
+    # Чтение и разбор файла энкодера занимают заметное время — не держим event loop
+    await run_in_threadpool(load_encoder)
+    if answer_writer is not None:
+        answer_writer.start()
+    process_rollup_refresher.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    process_rollup_refresher.stop()
+    # Дописываем ответы, оставшиеся в буфере
+    if answer_writer is not None:
+        answer_writer.stop()
 
 
 @app.get("/")
@@ -74,9 +138,10 @@ async def ping():
     return {"status": "ok"}
 
 
-@app.post("/api/register", response_model=CandidateResponse)
+@app.post("/api/register", response_model=CandidateResponse, dependencies=[Depends(public_endpoint_guard)])
 async def register_candidate(candidate_data: CandidateRegister, db: Session = Depends(get_db)):
     """Регистрация кандидата"""
+    check_name_rate_limit(candidate_data.full_name)
     try:
         candidate = find_candidate_by_name(db, candidate_data.full_name)
 
@@ -97,9 +162,55 @@ async def register_candidate(candidate_data: CandidateRegister, db: Session = De
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/chat", response_model=ChatResponse)
-async def chat_with_bot(chat_request: ChatRequest, db: Session = Depends(get_db)):
+async def chat_idempotent_replay(
+    request: Request,
+    chat_request: ChatRequest,
+    idempotency_key: Optional[str] = Header(None)
+) -> Optional[ChatResponse]:
+    """
+    Повтор (двойной клик, ретрай фронтенда) — ответ из кэша, без записи и сдвига состояния.
+    Выполняется до public_endpoint_guard: законный повтор не тратит лимиты по IP и ФИО и не получает 429.
+    """
+    key = chat_request.idempotency_key or idempotency_key
+    cached = chat_responses.get(chat_request.full_name, key) if key else None
+    if cached is not None:
+        metrics.increment("chat_idempotent_replays")
+        mark_idempotent_replay(request)
+    return cached
+
+
+@app.post(
+    "/api/chat",
+    response_model=ChatResponse,
+    dependencies=[Depends(chat_idempotent_replay), Depends(public_endpoint_guard)]
+)
+async def chat_with_bot(
+    chat_request: ChatRequest,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None),
+    replay: Optional[ChatResponse] = Depends(chat_idempotent_replay)
+):
     """Чат с ботом для проведения интервью"""
+    if replay is not None:
+        return replay
+    key = chat_request.idempotency_key or idempotency_key
+    check_name_rate_limit(chat_request.full_name)
+    # Сообщения одного кандидата обрабатываются строго по очереди
+    async with candidate_locks.hold(chat_request.full_name):
+        if key:
+            # Повтор мог прийти, пока первый запрос с тем же ключом ещё обрабатывался
+            cached = chat_responses.get(chat_request.full_name, key)
+            if cached is not None:
+                metrics.increment("chat_idempotent_replays")
+                return cached
+        response = await process_chat_message(chat_request, db)
+        if key:
+            chat_responses.put(chat_request.full_name, key, response)
+        return response
+
+
+async def process_chat_message(chat_request: ChatRequest, db: Session) -> ChatResponse:
+    """Обрабатывает одно сообщение кандидата"""
     try:
         candidate = find_candidate_by_name(db, chat_request.full_name)
         if not candidate:
@@ -111,11 +222,15 @@ async def chat_with_bot(chat_request: ChatRequest, db: Session = Depends(get_db)
 
         # Если пользователь просит начать интервью
         if chat_request.message.lower() == "начать интервью":
+            # План интервью собирается один раз, при первом сообщении
+            plan = None
+            if chat_request.full_name not in interview_manager.interview_states:
+                plan = get_interview_plan(db, processes)
             current_question, process_index, question_index = interview_manager.get_next_question(
-                chat_request.full_name, processes
+                chat_request.full_name, processes, plan
             )
             if current_question == "Интервью завершено":
-                return ChatResponse(bot_message="Ваше интервью завершено! Спасибо за участие!", progress=100)
+                return ChatResponse(bot_message=INTERVIEW_COMPLETED_MESSAGE, progress=100)
             return ChatResponse(bot_message=current_question, progress=0)
 
         # Обработка ответа пользователя
@@ -124,41 +239,38 @@ async def chat_with_bot(chat_request: ChatRequest, db: Session = Depends(get_db)
         if state_key not in interview_manager.interview_states:
             raise HTTPException(status_code=400, detail="Интервью ещё не начато. Отправьте 'начать интервью'")
         
-        state = interview_manager.interview_states[state_key]
-        process_index = state['current_process_index']
-        question_index = state['current_question_index']
-        
-        # Проверяем, не завершено ли интервью
-        if process_index >= len(processes):
-            return ChatResponse(bot_message="Ваше интервью завершено! Спасибо за участие!", progress=100)
-        
-        # Получаем текущий вопрос
-        current_process = processes[process_index]
-        current_question = INTERVIEW_QUESTIONS[question_index]
-        formatted_question = f"Процесс: {current_process}\n\n{current_question}"
+        # Получаем текущий шаг плана; None — интервью завершено
+        step = interview_manager.get_current_step(state_key)
+        if step is None:
+            return ChatResponse(bot_message=INTERVIEW_COMPLETED_MESSAGE, progress=100)
         
         # Валидируем ответ
-        is_valid = interview_manager.validate_answer(chat_request.message, current_question)
+        is_valid = interview_manager.validate_answer(chat_request.message, step.question, step.validator_type)
 
         # Сохраняем ответ
-        interview_answer = InterviewAnswer(
-            candidate_id=candidate.id,
-            question=formatted_question,
-            answer=chat_request.message,
-            is_valid=is_valid,
-            process=current_process,
-            question_number=question_index + 1
-        )
-        db.add(interview_answer)
-        db.commit()
+        try:
+            await save_answer(db, {
+                "candidate_id": candidate.id,
+                "question": step.prompt,
+                "answer": chat_request.message,
+                "is_valid": is_valid,
+                "process": step.process,
+                "question_number": step.question_index + 1,
+                "metric": step.metric
+            })
+        except WriteBufferFull as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
 
         # Обрабатываем ответ и получаем следующий вопрос
         bot_message, progress = interview_manager.process_answer(
             chat_request.full_name,
             chat_request.message,
-            current_question,
+            step.question,
             is_valid
         )
+        # Ответ на последний вопрос плана — интервью завершено, кандидата можно архивировать
+        if is_valid and interview_manager.get_current_step(state_key) is None:
+            mark_interview_completed(db, candidate.id)
 
         return ChatResponse(bot_message=bot_message, progress=progress)
 
@@ -180,41 +292,147 @@ async def admin_login(admin_data: AdminLogin):
 
 
 @app.get("/api/admin/dashboard", response_model=List[CandidateStatus])
-async def admin_dashboard(current_admin: str = Depends(get_current_admin), db: Session = Depends(get_db)):
-    return get_candidate_statuses(db)
+async def admin_dashboard(request: Request, current_admin: str = Depends(get_current_admin), db: Session = Depends(get_read_db)):
+    return versioned_json_response(
+        request, db, "dashboard",
+        lambda: [CandidateStatus(**item) for item in get_candidate_statuses(db)]
+    )
 
 
 @app.get("/api/admin/stats", response_model=AdminStats)
-async def admin_stats(current_admin: str = Depends(get_current_admin), db: Session = Depends(get_db)):
-    stats = get_admin_stats(db)
-    return AdminStats(**stats)
+async def admin_stats(request: Request, current_admin: str = Depends(get_current_admin), db: Session = Depends(get_read_db)):
+    return versioned_json_response(request, db, "stats", lambda: AdminStats(**get_admin_stats(db)))
 
 
 @app.get("/api/admin/analytics", response_model=List[AnalyticsData])
-async def admin_analytics(current_admin: str = Depends(get_current_admin), db: Session = Depends(get_db)):
-    analytics = get_analytics_data(db)
-    return [AnalyticsData(**item) for item in analytics]
+async def admin_analytics(request: Request, current_admin: str = Depends(get_current_admin), db: Session = Depends(get_read_db)):
+    return versioned_json_response(
+        request, db, "analytics",
+        lambda: [AnalyticsData(**item) for item in get_analytics_data(db)]
+    )
+
 
+@app.get("/api/admin/processes", response_model=List[ProcessRollupOut])
+async def admin_processes(request: Request, current_admin: str = Depends(get_current_admin), db: Session = Depends(get_db)):
+    """Сводка по процессам всех сотрудников (время, частота, стоимость)"""
+    return versioned_json_response(
+        request, db, "processes",
+        lambda: [ProcessRollupOut(**item) for item in get_process_rollups(db)]
+    )
+
+
+@app.get("/api/admin/search", response_model=AnswerSearchPage)
+async def admin_search_answers(
+    q: str,
+    process: Optional[str] = None,
+    question_number: Optional[int] = None,
+    page: int = 1,
+    page_size: int = 20,
+    current_admin: str = Depends(get_current_admin),
+    db: Session = Depends(get_read_db)
+):
+    """Полнотекстовый поиск по ответам интервью (совпадения подсвечены тегом <mark>)"""
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Пустой поисковый запрос")
+    return search_answers(db, q, process, question_number, page, page_size)
 
-@app.post("/api/admin/upload")
+
+@app.get("/api/admin/questions", response_model=QuestionBankOut)
+async def admin_get_questions(current_admin: str = Depends(get_current_admin), db: Session = Depends(get_db)):
+    version, questions = get_question_bank(db)
+    return QuestionBankOut(version=version, questions=questions)
+
+
+@app.post("/api/admin/questions", response_model=QuestionBankOut)
+async def admin_create_questions(
+    question_bank: QuestionBankIn,
+    current_admin: str = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Создаёт новую версию банка вопросов; начатые интервью продолжают идти по своей версии"""
+    questions = with_default_metrics([item.model_dump() for item in question_bank.questions])
+    try:
+        version = create_question_bank_version(db, questions)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return QuestionBankOut(version=version, questions=questions)
+
+
+@app.get("/api/admin/metrics")
+async def admin_metrics(current_admin: str = Depends(get_current_admin)):
+    return metrics.snapshot()
+
+
+@app.get("/api/admin/profiles")
+async def admin_list_profiles(current_admin: str = Depends(get_current_admin)):
+    """Сохранённые профили запросов (новые сверху)"""
+    return await run_in_threadpool(profile_store.list)
+
+
+@app.get("/api/admin/profiles/{profile_id}")
+async def admin_get_profile(profile_id: str, format: str = "json", current_admin: str = Depends(get_current_admin)):
+    """Профиль запроса: JSON (SQL и топ функций) или format=pstats — файл cProfile"""
+    if format == "pstats":
+        path = profile_store.pstats_path(profile_id)
+        if path is None:
+            raise HTTPException(status_code=404, detail="Профиль cProfile не найден")
+        return FileResponse(path, media_type="application/octet-stream", filename=f"profile_{profile_id}.prof")
+    profile = await run_in_threadpool(profile_store.get, profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Профиль не найден")
+    return profile
+
+
+ROSTER_UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {"file": {"type": "string", "format": "binary"}},
+            "required": ["file"]
+        }}}
+    }
+}
+
+
+@app.post("/api/admin/upload", openapi_extra=ROSTER_UPLOAD_OPENAPI)
 async def admin_upload_csv(
-    file: UploadFile = File(...),
+    request: Request,
     current_admin: str = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    if not file.filename.endswith(".csv"):
-        raise HTTPException(status_code=400, detail="File must be CSV")
-
-    content = await file.read()
-    csv_content = content.decode("utf-8")
+    # Тело multipart Starlette принимает целиком (файл — во временный файл на диске), и только потом
+    # файл разбирается потоково. Поэтому размер проверяем по Content-Length до приёма тела,
+    # а точный размер файла — ещё раз при чтении
+    content_length = request.headers.get("content-length")
+    if content_length is None or not content_length.isdigit():
+        raise HTTPException(status_code=411, detail="Нужен заголовок Content-Length")
+    if int(content_length) > ROSTER_MAX_UPLOAD_BYTES + ROSTER_MULTIPART_OVERHEAD_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Файл больше допустимого размера ({ROSTER_MAX_UPLOAD_MB:g} МБ)"
+        )
+    async with request.form(max_files=1, max_fields=10) as form:
+        file = form.get("file")
+        if not isinstance(file, StarletteUploadFile):
+            raise HTTPException(status_code=400, detail="Файл не передан (поле file)")
+        if not is_roster_file(file.filename or ""):
+            raise HTTPException(status_code=400, detail="File must be CSV or XLSX")
+
+        # Файл читается потоково по частям, в отдельном потоке, чтобы не блокировать event loop
+        try:
+            summary = await run_in_threadpool_profiled(import_roster_file, db, file.file, file.filename)
+        except RosterImportError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            print(f"Ошибка при обновлении CSV: {e}")
+            raise HTTPException(status_code=400, detail="Failed to process CSV file")
 
-    if update_candidates_from_csv(db, csv_content):
-        return {"message": "CSV uploaded successfully"}
-    raise HTTPException(status_code=400, detail="Failed to process CSV file")
+    return {"message": f"{summary['format'].upper()} uploaded successfully", **summary}
 
 
 @app.get("/api/admin/export")
-async def admin_export(current_admin: str = Depends(get_current_admin), db: Session = Depends(get_db)):
+async def admin_export(current_admin: str = Depends(get_current_admin), db: Session = Depends(get_read_db)):
     csv_content = export_candidates_data(db)
     return StreamingResponse(
         io.BytesIO(csv_content.encode("utf-8")),
@@ -223,8 +441,74 @@ async def admin_export(current_admin: str = Depends(get_current_admin), db: Sess
     )
 
 
+@app.get("/api/admin/export/answers")
+async def admin_export_answers(format: str = "parquet", current_admin: str = Depends(get_current_admin)):
+    """Экспорт всех ответов интервью в Parquet или Arrow IPC для BI (потоково, пачками)"""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Формат должен быть одним из: {', '.join(EXPORT_FORMATS)}")
+    media_type, extension = EXPORT_FORMATS[format]
+
+    def content():
+        # Своя сессия: генератор работает, пока ответ отдаётся клиенту
+        db = read_session()
+        try:
+            yield from stream_answers_export(db, format)
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        content(),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=interview_answers.{extension}"}
+    )
+
+
+@app.get("/api/admin/export/delta")
+async def admin_export_delta(
+    cursor: Optional[str] = None,
+    current_admin: str = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Инкрементальная выгрузка NDJSON: кандидаты и ответы, изменённые после cursor; следующий курсор — в X-Next-Cursor"""
+    try:
+        since = decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    bounds = prepare_delta_export(db, since)
+
+    def content():
+        # Своя сессия: генератор работает, пока ответ отдаётся клиенту
+        stream_db = SessionLocal()
+        try:
+            yield from stream_delta_export(stream_db, bounds)
+        finally:
+            stream_db.close()
+
+    return StreamingResponse(
+        content(),
+        media_type="application/x-ndjson",
+        headers={"X-Next-Cursor": encode_cursor(bounds.until)}
+    )
+
+
+@app.get("/api/admin/archives", response_model=List[AnswerArchiveOut])
+async def admin_list_archives(current_admin: str = Depends(get_current_admin), db: Session = Depends(get_db)):
+    return list_archives(db)
+
+
+@app.post("/api/admin/archives", response_model=AnswerArchiveRun)
+async def admin_archive_answers(
+    payload: AnswerArchiveIn,
+    current_admin: str = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Переносит ответы кандидатов, завершивших интервью до older_than, в архивный Parquet-файл"""
+    return await run_in_threadpool_profiled(archive_answers, db, payload.older_than)
+
+
 @app.get("/api/admin/report/{candidate_id}")
-async def generate_pdf_report(candidate_id: int, current_admin: str = Depends(get_current_admin), db: Session = Depends(get_db)):
+async def generate_pdf_report(candidate_id: int, current_admin: str = Depends(get_current_admin), db: Session = Depends(get_read_db)):
+    from report_generator import generate_report_files
     try:
         pdf_path, _ = generate_report_files(db, candidate_id)
         if not pdf_path:
@@ -235,7 +519,8 @@ async def generate_pdf_report(candidate_id: int, current_admin: str = Depends(ge
 
 
 @app.get("/api/admin/report_excel/{candidate_id}")
-async def generate_excel_report(candidate_id: int, current_admin: str = Depends(get_current_admin), db: Session = Depends(get_db)):
+async def generate_excel_report(candidate_id: int, current_admin: str = Depends(get_current_admin), db: Session = Depends(get_read_db)):
+    from report_generator import generate_report_files
     try:
         _, excel_path = generate_report_files(db, candidate_id)
         if not excel_path:
@@ -249,6 +534,24 @@ async def generate_excel_report(candidate_id: int, current_admin: str = Depends(
         raise HTTPException(status_code=500, detail=f"Ошибка генерации отчёта: {str(e)}")
 
 
+@app.get("/api/admin/summary_report")
+async def generate_summary_report(format: str = "pdf", current_admin: str = Depends(get_current_admin), db: Session = Depends(get_read_db)):
+    """Сводный отчёт по всем сотрудникам и процессам (PDF или XLSX)"""
+    from summary_report import generate_summary_report as build_summary_report, SUMMARY_REPORT_FORMATS
+    if format not in SUMMARY_REPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Формат должен быть одним из: {', '.join(SUMMARY_REPORT_FORMATS)}")
+    try:
+        path = await run_in_threadpool_profiled(build_summary_report, db, format)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка генерации отчёта: {str(e)}")
+    return FileResponse(
+        path,
+        media_type=SUMMARY_REPORT_FORMATS[format],
+        filename=f"summary_report.{format}",
+        background=BackgroundTask(os.remove, path)
+    )
+
+
 @app.get("/api/health")
 async def health():
     try:
@@ -256,7 +559,7 @@ async def health():
         from sqlalchemy import text
         with engine.connect() as conn:
             conn.execute(text("SELECT 1"))
-        return {"status": "healthy", "database": "connected"}
+        return {"status": "healthy", "database": "connected", "replica": replica_router.status()}
     except Exception as e:
         return {"status": "unhealthy", "database": "disconnected", "error": str(e)}
 
@@ -267,6 +570,7 @@ class AIHelperIn(BaseModel):
     answer: str
     context: Dict[str, Any] = {}
     step_counter: int = 0
+    history: List[Dict[str, str]] = []
 
 
 class AIHelperOut(BaseModel):
@@ -280,15 +584,46 @@ def ai_helper(payload: AIHelperIn = Body(...)):
         current_question=payload.question,
         user_answer=payload.answer,
         profile_context=payload.context,
-        step_counter=payload.step_counter
+        step_counter=payload.step_counter,
+        history=payload.history
     )
     return AIHelperOut(**data)
 
 
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/api/interview/ai-helper/stream")
+def ai_helper_stream(payload: AIHelperIn = Body(...)):
+    """Потоковая версия ai-helper (server-sent events): сначала мотивационная фраза, затем токены вопроса"""
+    def event_stream():
+        yield _sse_event("motivation", {"motivation_phrase": pick_motivation_phrase()})
+        follow_up = []
+        try:
+            for token in stream_follow_up_tokens(
+                current_question=payload.question,
+                user_answer=payload.answer,
+                profile_context=payload.context,
+                history=payload.history
+            ):
+                follow_up.append(token)
+                yield _sse_event("token", {"text": token})
+        except Exception as e:
+            yield _sse_event("error", {"detail": str(e)})
+            return
+        yield _sse_event("done", {"follow_up_question": "".join(follow_up)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # --- ВНИМАНИЕ: этот блок всегда внизу ---
 if __name__ == "__main__":
     import uvicorn
-    import os
     port = int(os.environ.get("PORT", 8000))
     uvicorn.run(app, host="0.0.0.0", port=port)
 
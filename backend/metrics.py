@@ -0,0 +1,41 @@
+import threading
+from collections import deque
+from typing import Dict, Any
+
+# Простое in-process хранилище метрик (счётчики + последние наблюдения)
+RECENT_OBSERVATIONS_LIMIT = 100
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = {}
+_gauges: Dict[str, float] = {}
+_recent: Dict[str, deque] = {}
+
+
+def increment(name: str, value: float = 1) -> None:
+    """Увеличивает счётчик метрики"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def set_gauge(name: str, value: float) -> None:
+    """Устанавливает текущее значение метрики-показателя (например, число запросов в работе)"""
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name: str, data: Dict[str, Any]) -> None:
+    """Сохраняет наблюдение (например, использование токенов одним запросом)"""
+    with _lock:
+        if name not in _recent:
+            _recent[name] = deque(maxlen=RECENT_OBSERVATIONS_LIMIT)
+        _recent[name].append(data)
+
+
+def snapshot() -> Dict[str, Any]:
+    """Возвращает копию всех метрик"""
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "recent": {name: list(items) for name, items in _recent.items()}
+        }
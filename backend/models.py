@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Float, Sequence
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
 Base = declarative_base()
 
+# Счётчик поколения данных админки (PostgreSQL): nextval не блокирует строк, в отличие от UPDATE счётчика.
+# На SQLite create_all последовательность пропускает — там счётчик хранится в app_metadata
+data_generation_seq = Sequence("data_generation_seq", metadata=Base.metadata)
+
 class Candidate(Base):
     __tablename__ = "candidates"
     
@@ -13,6 +17,8 @@ class Candidate(Base):
     processes = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Когда кандидат ответил на все вопросы плана (None — интервью не завершено)
+    interview_completed_at = Column(DateTime(timezone=True), nullable=True)
     
     # Связь с ответами интервью
     interview_answers = relationship("InterviewAnswer", back_populates="candidate")
@@ -27,7 +33,85 @@ class InterviewAnswer(Base):
     is_valid = Column(Boolean, default=True)
     process = Column(String(255), nullable=False)
     question_number = Column(Integer, nullable=False)
+    # Роль вопроса в расчёте метрик (process_metrics.METRICS) или None
+    metric = Column(String(32), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Связь с кандидатом
     candidate = relationship("Candidate", back_populates="interview_answers")
+
+class QuestionBankVersion(Base):
+    __tablename__ = "question_bank_versions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    version = Column(Integer, nullable=False, unique=True)
+    # JSON-список вопросов: [{"text": ..., "type": ..., "weight": ...}]
+    questions = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class AppMetadata(Base):
+    __tablename__ = "app_metadata"
+    
+    key = Column(String(100), primary_key=True)
+    # JSON-значение
+    value = Column(Text, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class Process(Base):
+    __tablename__ = "processes"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(255), nullable=False, unique=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class CandidateProcess(Base):
+    __tablename__ = "candidate_processes"
+    
+    candidate_id = Column(Integer, ForeignKey("candidates.id"), primary_key=True)
+    process_id = Column(Integer, ForeignKey("processes.id"), primary_key=True, index=True)
+
+class CandidateProcessMetrics(Base):
+    __tablename__ = "candidate_process_metrics"
+    
+    # Последние валидные числовые ответы кандидата по процессу
+    candidate_id = Column(Integer, ForeignKey("candidates.id"), primary_key=True)
+    process_id = Column(Integer, ForeignKey("processes.id"), primary_key=True, index=True)
+    iteration_time = Column(Float, nullable=True)
+    frequency = Column(Float, nullable=True)
+    session_count = Column(Float, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class ProcessRollup(Base):
+    __tablename__ = "process_rollups"
+    
+    process_id = Column(Integer, ForeignKey("processes.id"), primary_key=True)
+    respondents = Column(Integer, nullable=False, default=0)
+    median_iteration_time = Column(Float, nullable=True)
+    median_frequency = Column(Float, nullable=True)
+    median_session_count = Column(Float, nullable=True)
+    total_minutes = Column(Float, nullable=False, default=0)
+    refreshed_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class AnswerArchive(Base):
+    __tablename__ = "answer_archives"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    # Имя Parquet-файла в ANSWER_ARCHIVE_DIR
+    file_name = Column(String(255), nullable=False, unique=True)
+    cutoff = Column(DateTime(timezone=True), nullable=False)
+    answers_count = Column(Integer, nullable=False, default=0)
+    candidates_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ArchivedCandidateSummary(Base):
+    __tablename__ = "archived_candidate_summaries"
+    
+    # Сводка по ответам кандидата, перенесённым в архив (вместо самих ответов)
+    candidate_id = Column(Integer, ForeignKey("candidates.id"), primary_key=True)
+    archive_id = Column(Integer, ForeignKey("answer_archives.id"), primary_key=True)
+    answers_count = Column(Integer, nullable=False, default=0)
+    valid_answers_count = Column(Integer, nullable=False, default=0)
+    processes = Column(Text, nullable=True)
+    total_time_minutes = Column(Float, nullable=False, default=0)
+    first_answer_at = Column(DateTime(timezone=True), nullable=True)
+    last_answer_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,293 @@
+import os
+import statistics
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Any, Optional, Set, Tuple
+from sqlalchemy import insert, select, func, text
+from sqlalchemy.orm import Session
+
+from models import (
+    Candidate, InterviewAnswer, Process, CandidateProcess, CandidateProcessMetrics, ProcessRollup
+)
+from app_metadata import get_metadata, set_metadata
+from data_version import bump_data_generation
+from delta_export import DELTA_EXPORT_SETTLE_SECONDS
+from process_metrics import (
+    ITERATION_TIME_METRIC, FREQUENCY_METRIC, SESSION_COUNT_METRIC, NUMERIC_METRICS,
+    parse_metric_value, calculate_total_time, get_rate_per_minute
+)
+
+# id последнего ответа, учтённого в сводках по процессам
+PROCESS_ROLLUP_WATERMARK_KEY = "process_rollup_watermark"
+ROLLUP_BATCH_SIZE = 5000
+# Как часто фоновый поток досчитывает сводки по новым ответам
+PROCESS_ROLLUP_REFRESH_SECONDS = float(os.getenv("PROCESS_ROLLUP_REFRESH_SECONDS", "10"))
+# Ответы моложе окна выгрузки ещё не учитываются — как в инкрементальной выгрузке:
+# транзакции с меньшими id успевают зафиксироваться, и водяной знак их не перепрыгивает
+PROCESS_ROLLUP_SETTLE_SECONDS = DELTA_EXPORT_SETTLE_SECONDS
+# Ключ advisory-блокировки PostgreSQL: сводки обновляет только один воркер за раз
+PROCESS_ROLLUP_LOCK_KEY = 7039001
+
+# Роль вопроса -> поле CandidateProcessMetrics
+METRIC_FIELDS = {
+    ITERATION_TIME_METRIC: "iteration_time",
+    FREQUENCY_METRIC: "frequency",
+    SESSION_COUNT_METRIC: "session_count",
+}
+
+
+def split_processes(processes: str) -> List[str]:
+    """Разбивает строку процессов кандидата на названия"""
+    return [p.strip() for p in (processes or "").split(",") if p.strip()]
+
+
+def get_or_create_processes(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """Возвращает id процессов каталога по названиям, создавая недостающие"""
+    names = set(names)
+    if not names:
+        return {}
+    process_ids = {
+        name: process_id
+        for process_id, name in db.query(Process.id, Process.name).filter(Process.name.in_(list(names)))
+    }
+    missing = names - set(process_ids)
+    if missing:
+        # Процесс с тем же названием может параллельно создать загрузка списка или другой воркер
+        db.execute(_insert_ignoring_conflicts(db, Process), [{"name": name} for name in missing])
+        process_ids.update(
+            (name, process_id)
+            for process_id, name in db.query(Process.id, Process.name).filter(Process.name.in_(list(missing)))
+        )
+    return process_ids
+
+
+def _insert_ignoring_conflicts(db: Session, model):
+    """INSERT ... ON CONFLICT DO NOTHING для PostgreSQL и SQLite (иначе обычный INSERT)"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return insert(model)
+    return dialect_insert(model).on_conflict_do_nothing()
+
+
+def sync_candidate_processes(db: Session, candidates: List[Candidate]):
+    """Обновляет связи кандидатов с каталогом процессов (кандидаты должны иметь id)"""
+    if not candidates:
+        return
+    process_ids = get_or_create_processes(
+        db, (name for candidate in candidates for name in split_processes(candidate.processes))
+    )
+    candidate_ids = [candidate.id for candidate in candidates]
+    db.query(CandidateProcess).filter(
+        CandidateProcess.candidate_id.in_(candidate_ids)
+    ).delete(synchronize_session=False)
+    links = {
+        (candidate.id, process_ids[name])
+        for candidate in candidates for name in split_processes(candidate.processes)
+    }
+    db.bulk_insert_mappings(CandidateProcess, [
+        {"candidate_id": candidate_id, "process_id": process_id} for candidate_id, process_id in links
+    ])
+
+
+def backfill_process_catalog(db: Session, batch_size: int = 1000):
+    """Заполняет каталог процессов по уже загруженным кандидатам (один раз, если каталог пуст)"""
+    if db.query(Process.id).first() is not None:
+        return
+    batch: List[Candidate] = []
+    for candidate in db.query(Candidate).yield_per(batch_size):
+        batch.append(candidate)
+        if len(batch) >= batch_size:
+            sync_candidate_processes(db, batch)
+            batch = []
+    sync_candidate_processes(db, batch)
+    db.commit()
+
+
+def _recompute_rollup(db: Session, process_id: int):
+    """Пересчитывает сводку одного процесса по метрикам кандидатов"""
+    rows = db.query(
+        CandidateProcessMetrics.iteration_time,
+        CandidateProcessMetrics.frequency,
+        CandidateProcessMetrics.session_count
+    ).filter(CandidateProcessMetrics.process_id == process_id).all()
+
+    def median(values):
+        values = [v for v in values if v is not None]
+        return statistics.median(values) if values else None
+
+    total_minutes = sum(
+        calculate_total_time(row.iteration_time or 0, row.frequency or 0, row.session_count or 0)
+        for row in rows
+    )
+    rollup = db.get(ProcessRollup, process_id)
+    if rollup is None:
+        rollup = ProcessRollup(process_id=process_id)
+        db.add(rollup)
+    rollup.respondents = len(rows)
+    rollup.median_iteration_time = median(row.iteration_time for row in rows)
+    rollup.median_frequency = median(row.frequency for row in rows)
+    rollup.median_session_count = median(row.session_count for row in rows)
+    rollup.total_minutes = total_minutes
+
+
+_refresh_lock = threading.Lock()
+
+
+def _lock_rollups(db: Session):
+    """Блокировка обновления сводок до конца транзакции — общая для всех воркеров (PostgreSQL)"""
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PROCESS_ROLLUP_LOCK_KEY})
+
+
+def refresh_process_rollups(db: Session) -> int:
+    """
+    Инкрементально обновляет сводки: учитывает только ответы, пришедшие после прошлого обновления,
+    и пересчитывает лишь затронутые процессы. Повторный запуск безопасен (значения перезаписываются).
+    Обновления сериализуются блокировкой. Возвращает число учтённых ответов.
+    """
+    with _refresh_lock:
+        _lock_rollups(db)
+        try:
+            return _refresh_process_rollups(db)
+        except Exception:
+            db.rollback()
+            raise
+
+
+def _refresh_process_rollups(db: Session) -> int:
+    watermark = get_metadata(db, PROCESS_ROLLUP_WATERMARK_KEY) or 0
+    settled_at = datetime.now(timezone.utc) - timedelta(seconds=PROCESS_ROLLUP_SETTLE_SECONDS)
+    max_id = db.query(func.max(InterviewAnswer.id)).filter(
+        InterviewAnswer.id > watermark,
+        InterviewAnswer.created_at <= settled_at
+    ).scalar()
+    if max_id is None:
+        db.commit()
+        return 0
+
+    processed = 0
+    affected: Set[int] = set()
+    last_id = watermark
+    while True:
+        rows = db.execute(
+            select(
+                InterviewAnswer.id, InterviewAnswer.candidate_id, InterviewAnswer.process,
+                InterviewAnswer.metric, InterviewAnswer.answer
+            )
+            .where(
+                InterviewAnswer.id > last_id,
+                InterviewAnswer.id <= max_id,
+                InterviewAnswer.is_valid == True,
+                InterviewAnswer.metric.in_(NUMERIC_METRICS)
+            )
+            .order_by(InterviewAnswer.id)
+            .limit(ROLLUP_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        processed += len(rows)
+
+        process_ids = get_or_create_processes(db, (row.process for row in rows))
+        keys = {(row.candidate_id, process_ids[row.process]) for row in rows}
+        metrics_rows: Dict[Tuple[int, int], CandidateProcessMetrics] = {
+            (m.candidate_id, m.process_id): m
+            for m in db.query(CandidateProcessMetrics).filter(
+                CandidateProcessMetrics.candidate_id.in_({key[0] for key in keys}),
+                CandidateProcessMetrics.process_id.in_({key[1] for key in keys})
+            )
+        }
+        # Ответы идут по возрастанию id, поэтому последний валидный ответ перезаписывает предыдущий
+        for row in rows:
+            number = parse_metric_value(row.answer, row.metric)
+            if number is None:
+                continue
+            key = (row.candidate_id, process_ids[row.process])
+            metrics_row = metrics_rows.get(key)
+            if metrics_row is None:
+                metrics_row = metrics_rows[key] = CandidateProcessMetrics(candidate_id=key[0], process_id=key[1])
+                db.add(metrics_row)
+            setattr(metrics_row, METRIC_FIELDS[row.metric], number)
+            affected.add(key[1])
+        db.flush()
+
+    for process_id in affected:
+        _recompute_rollup(db, process_id)
+    set_metadata(db, PROCESS_ROLLUP_WATERMARK_KEY, max_id)
+    db.commit()
+    if affected:
+        # Ответ /api/admin/processes кэшируется по версии данных
+        bump_data_generation(db)
+    return processed
+
+
+class ProcessRollupRefresher:
+    """Фоновый поток: раз в interval секунд досчитывает сводки по новым ответам"""
+
+    def __init__(self, session_factory=None, interval: float = PROCESS_ROLLUP_REFRESH_SECONDS):
+        self.session_factory = session_factory
+        self.interval = interval
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="process-rollups", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        if self.session_factory is None:
+            from database import SessionLocal
+            self.session_factory = SessionLocal
+        while not self._stopping.wait(self.interval):
+            db = self.session_factory()
+            try:
+                refresh_process_rollups(db)
+            except Exception as e:
+                print(f"Ошибка обновления сводок по процессам: {e}")
+            finally:
+                db.close()
+
+
+process_rollup_refresher = ProcessRollupRefresher()
+
+
+def get_process_rollups(db: Session) -> List[Dict[str, Any]]:
+    """
+    Возвращает сводку по всем процессам каталога. Только чтение: сводки досчитывает
+    фоновый ProcessRollupRefresher, поэтому они отстают от ответов на несколько секунд
+    """
+    assigned = dict(
+        db.query(CandidateProcess.process_id, func.count(CandidateProcess.candidate_id))
+        .group_by(CandidateProcess.process_id)
+    )
+    rate_per_minute = get_rate_per_minute()
+    result = []
+    for process, rollup in db.query(Process, ProcessRollup).outerjoin(
+        ProcessRollup, ProcessRollup.process_id == Process.id
+    ):
+        total_minutes = rollup.total_minutes if rollup else 0.0
+        result.append({
+            "process": process.name,
+            "assigned_candidates": assigned.get(process.id, 0),
+            "respondents": rollup.respondents if rollup else 0,
+            "median_iteration_time": rollup.median_iteration_time if rollup else None,
+            "median_frequency": rollup.median_frequency if rollup else None,
+            "median_session_count": rollup.median_session_count if rollup else None,
+            "total_minutes": total_minutes,
+            "estimated_cost_rub": total_minutes * rate_per_minute
+        })
+    result.sort(key=lambda item: item["estimated_cost_rub"], reverse=True)
+    return result
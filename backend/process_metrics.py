@@ -0,0 +1,113 @@
+import os
+import re
+from typing import Optional
+
+# Роли вопросов в расчёте метрик: задаются в банке вопросов (поле metric) и сохраняются
+# вместе с ответом, поэтому не зависят от номера вопроса в версии банка
+ITERATION_TIME_METRIC = "iteration_time"
+FREQUENCY_METRIC = "frequency"
+SESSION_COUNT_METRIC = "session_count"
+TOOLS_METRIC = "tools"
+NUMERIC_METRICS = (ITERATION_TIME_METRIC, FREQUENCY_METRIC, SESSION_COUNT_METRIC)
+METRICS = NUMERIC_METRICS + (TOOLS_METRIC,)
+
+# Роли по номеру вопроса в банке по умолчанию (INTERVIEW_QUESTIONS) — для ответов,
+# сохранённых до появления ролей
+LEGACY_QUESTION_METRICS = {
+    2: ITERATION_TIME_METRIC,
+    3: FREQUENCY_METRIC,
+    4: SESSION_COUNT_METRIC,
+    6: TOOLS_METRIC,
+}
+
+_number_regex = re.compile(r'\d+')
+
+# Длительность с единицами: «15 минут», «2 часа», «1.5h», «1 час 30 минут», «90 сек».
+# Число без единиц — минуты (так спрашивает вопрос); диапазон «15-20 минут» — по первому числу
+_duration_regex = re.compile(
+    r"(?P<value>\d+(?:[.,]\d+)?)(?:\s*[-–]\s*\d+(?:[.,]\d+)?)?\s*"
+    r"(?:(?P<hours>час(?:а|ов)?|ч|hours?|hrs?|h)"
+    r"|(?P<minutes>минут[аы]?|мин|м|minutes?|mins?|m)"
+    r"|(?P<seconds>секунд[аы]?|сек|seconds?|secs?|s))?"
+    r"(?![а-яёa-z])",
+    re.IGNORECASE
+)
+_DURATION_UNIT_MINUTES = {"hours": 60.0, "minutes": 1.0, "seconds": 1 / 60}
+# Длительность словами, без чисел
+_DURATION_WORDS = (("полтора час", 90.0), ("полчаса", 30.0), ("час", 60.0))
+
+
+def get_rate_per_minute() -> float:
+    """Ставка за минуту для расчёта стоимости процессов"""
+    return float(os.getenv("PROCESS_RATE_PER_MINUTE", "0.5"))
+
+
+def extract_first_number(text: str) -> Optional[float]:
+    """Возвращает первое число из ответа (или None)"""
+    match = _number_regex.search(text or "")
+    return float(match.group()) if match else None
+
+
+def parse_duration_minutes(text: str) -> Optional[float]:
+    """Длительность из ответа в минутах с учётом единиц (часы, минуты, секунды) или None"""
+    components = []
+    for match in _duration_regex.finditer(text or ""):
+        unit = next((name for name in _DURATION_UNIT_MINUTES if match.group(name)), None)
+        components.append((float(match.group("value").replace(",", ".")), unit))
+    if not components:
+        lowered = (text or "").lower()
+        return next((minutes for word, minutes in _DURATION_WORDS if word in lowered), None)
+    units = [unit for _, unit in components]
+    # «1 час 30 минут» — сумма частей с разными единицами; иначе берём первое значение, как и раньше
+    if len(components) > 1 and None not in units and len(set(units)) == len(units):
+        return sum(value * _DURATION_UNIT_MINUTES[unit] for value, unit in components)
+    value, unit = components[0]
+    return value * _DURATION_UNIT_MINUTES[unit or "minutes"]
+
+
+def parse_metric_value(answer: str, metric: Optional[str]) -> Optional[float]:
+    """Числовое значение ответа для роли в метриках: время итерации — в минутах с учётом единиц"""
+    if metric == ITERATION_TIME_METRIC:
+        return parse_duration_minutes(answer)
+    return extract_first_number(answer)
+
+
+def calculate_total_time(iteration_time: float, frequency: float, session_count: float) -> float:
+    """Общее время процесса (мин): время итерации × частота × повторы за сессию"""
+    return iteration_time * frequency * session_count
+
+
+def calculate_process_metrics(answers):
+    """Рассчитывает метрики процесса"""
+    iteration_time = 0
+    frequency = 0
+    session_count = 0
+    tools = []
+    
+    for answer in answers:
+        if answer.metric == ITERATION_TIME_METRIC:  # Время итерации (в минутах)
+            number = parse_duration_minutes(answer.answer)
+            if number is not None:
+                iteration_time = number
+        elif answer.metric == FREQUENCY_METRIC:  # Частота
+            number = extract_first_number(answer.answer)
+            if number is not None:
+                frequency = number
+        elif answer.metric == SESSION_COUNT_METRIC:  # Количество повторов
+            number = extract_first_number(answer.answer)
+            if number is not None:
+                session_count = number
+        elif answer.metric == TOOLS_METRIC:  # Инструменты
+            tools.append(answer.answer)
+    
+    total_time = calculate_total_time(iteration_time, frequency, session_count)
+    process_cost = total_time * get_rate_per_minute()
+    
+    return {
+        'iteration_time': iteration_time,
+        'frequency': frequency,
+        'session_count': session_count,
+        'total_time': total_time,
+        'process_cost': process_cost,
+        'tools': tools
+    }
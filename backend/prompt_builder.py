@@ -0,0 +1,172 @@
+import hashlib
+import os
+from functools import lru_cache
+from typing import List, Dict, Any, Optional
+
+import metrics
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Конфигурация бюджета промпта
+TIKTOKEN_ENCODING = os.getenv("TIKTOKEN_ENCODING", "cl100k_base")
+# tiktoken — точный подсчёт по файлу энкодера, approx — приближённо (~4 символа на токен)
+PROMPT_TOKEN_COUNTER = os.getenv("PROMPT_TOKEN_COUNTER", "tiktoken").strip().lower()
+# Файл энкодера берётся только из этого каталога, в сеть при старте не ходим.
+# Dockerfile скачивает его при сборке образа.
+TIKTOKEN_CACHE_DIR = os.getenv("TIKTOKEN_CACHE_DIR") or os.path.join(BACKEND_DIR, "tiktoken_cache")
+TIKTOKEN_BPE_URL = f"https://openaipublic.blob.core.windows.net/encodings/{TIKTOKEN_ENCODING}.tiktoken"
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "2000"))
+# Сколько токенов резервируем под сводку отброшенных реплик
+SUMMARY_TOKEN_BUDGET = int(os.getenv("PROMPT_SUMMARY_TOKEN_BUDGET", "200"))
+
+if PROMPT_TOKEN_COUNTER not in ("tiktoken", "approx"):
+    raise ValueError(f"PROMPT_TOKEN_COUNTER должен быть tiktoken или approx, получено: {PROMPT_TOKEN_COUNTER}")
+
+SYSTEM_PROMPT = (
+    "Ты помощник интервьюера. Задай один короткий уточняющий вопрос "
+    "по процессу сотрудника и добавь мотивационную фразу."
+)
+
+# Энкодер загружается один раз на процесс
+_encoder = None
+_encoder_loaded = False
+
+
+def encoder_cache_path() -> str:
+    """Путь к файлу энкодера в кэше tiktoken (имя файла — sha1 от URL, как в самом tiktoken)"""
+    return os.path.join(TIKTOKEN_CACHE_DIR, hashlib.sha1(TIKTOKEN_BPE_URL.encode()).hexdigest())
+
+
+def load_encoder():
+    """Загружает энкодер tiktoken (один раз на процесс).
+
+    Читает файл только из TIKTOKEN_CACHE_DIR: если его нет, падает с понятной ошибкой,
+    а не скачивает по сети. При PROMPT_TOKEN_COUNTER=approx энкодер не нужен.
+    """
+    global _encoder, _encoder_loaded
+    if _encoder_loaded:
+        return _encoder
+    if PROMPT_TOKEN_COUNTER == "approx":
+        _encoder_loaded = True
+        return None
+    if not os.path.exists(encoder_cache_path()):
+        raise RuntimeError(
+            f"Файл энкодера tiktoken ({TIKTOKEN_ENCODING}) не найден в {TIKTOKEN_CACHE_DIR}. "
+            f"Скачайте его при сборке (см. Dockerfile) или задайте PROMPT_TOKEN_COUNTER=approx"
+        )
+    os.environ["TIKTOKEN_CACHE_DIR"] = TIKTOKEN_CACHE_DIR
+    import tiktoken
+    _encoder = tiktoken.get_encoding(TIKTOKEN_ENCODING)
+    _encoder_loaded = True
+    return _encoder
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    """Считает токены в тексте (результат кэшируется, поэтому каждая реплика кодируется один раз)"""
+    if not text:
+        return 0
+    encoder = load_encoder()
+    if encoder is None:
+        # PROMPT_TOKEN_COUNTER=approx: ~4 символа на токен
+        return max(1, len(text) // 4)
+    return len(encoder.encode(text))
+
+
+def _format_turn(turn: Dict[str, str]) -> str:
+    return f"Вопрос: {turn.get('question', '')}\nОтвет: {turn.get('answer', '')}"
+
+
+def _format_profile(profile_context: Dict[str, Any]) -> str:
+    if not profile_context:
+        return ""
+    lines = [f"{key}: {value}" for key, value in profile_context.items() if key != "history"]
+    return "Профиль сотрудника:\n" + "\n".join(lines) if lines else ""
+
+
+def _summarize_turns(turns: List[Dict[str, str]], budget: int) -> str:
+    """Сжимает старые реплики в короткую сводку в пределах бюджета"""
+    if not turns or budget <= 0:
+        return ""
+    summary = f"Ранее обсуждено вопросов: {len(turns)}."
+    used = count_tokens(summary)
+    if used > budget:
+        return ""
+    parts = [summary]
+    for turn in turns:
+        answer = (turn.get("answer") or "").strip().split("\n")[0][:80]
+        if not answer:
+            continue
+        line = f"- {answer}"
+        line_tokens = count_tokens(line)
+        if used + line_tokens > budget:
+            break
+        parts.append(line)
+        used += line_tokens
+    return "\n".join(parts)
+
+
+def build_prompt(
+    current_question: str,
+    user_answer: str,
+    profile_context: Optional[Dict[str, Any]] = None,
+    history: Optional[List[Dict[str, str]]] = None,
+    budget: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Собирает промпт для LLM в пределах бюджета токенов.
+    Свежие реплики истории сохраняются целиком, старые сжимаются в сводку.
+    """
+    budget = budget or PROMPT_TOKEN_BUDGET
+    profile_context = profile_context or {}
+    history = history or profile_context.get("history") or []
+
+    profile_text = _format_profile(profile_context)
+    current_text = _format_turn({"question": current_question, "answer": user_answer})
+
+    used = count_tokens(SYSTEM_PROMPT) + count_tokens(profile_text) + count_tokens(current_text)
+    remaining = budget - used
+
+    # Идём от новых реплик к старым, пока хватает бюджета
+    kept: List[str] = []
+    history_budget = remaining - SUMMARY_TOKEN_BUDGET
+    index = len(history)
+    while index > 0:
+        turn_text = _format_turn(history[index - 1])
+        turn_tokens = count_tokens(turn_text)
+        if turn_tokens > history_budget:
+            break
+        kept.append(turn_text)
+        history_budget -= turn_tokens
+        used += turn_tokens
+        index -= 1
+    kept.reverse()
+
+    dropped = history[:index]
+    summary = _summarize_turns(dropped, min(SUMMARY_TOKEN_BUDGET, budget - used))
+    used += count_tokens(summary)
+
+    sections = [s for s in [profile_text, summary, "\n\n".join(kept), current_text] if s]
+    prompt = {
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": "\n\n".join(sections)}
+        ],
+        "prompt_tokens": used,
+        "budget": budget,
+        "history_turns": len(history),
+        "kept_turns": len(kept),
+        "summarized_turns": len(dropped)
+    }
+
+    metrics.increment("prompt_requests")
+    metrics.increment("prompt_tokens_total", used)
+    if dropped:
+        metrics.increment("prompt_turns_summarized", len(dropped))
+    metrics.observe("prompt_usage", {
+        "prompt_tokens": used,
+        "budget": budget,
+        "kept_turns": len(kept),
+        "summarized_turns": len(dropped)
+    })
+    return prompt
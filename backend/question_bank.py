@@ -0,0 +1,120 @@
+import json
+import threading
+from typing import List, Dict, Any, Tuple
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from models import InterviewAnswer, QuestionBankVersion
+from app_metadata import get_metadata, set_metadata
+from interview_logic import InterviewPlan, answer_rules, default_questions
+from process_metrics import METRICS
+
+ANSWER_METRICS_BACKFILL_KEY = "answer_metrics_backfilled"
+
+# Версии банка вопросов неизменяемы, поэтому разобранные вопросы и планы кэшируются по версии
+PLAN_CACHE_LIMIT = 1024
+
+_lock = threading.Lock()
+_questions_cache: Dict[int, List[Dict[str, Any]]] = {}
+_plan_cache: Dict[Tuple[int, Tuple[str, ...]], InterviewPlan] = {}
+
+
+def ensure_question_bank(db: Session) -> int:
+    """Создаёт первую версию банка вопросов, если банк пуст; возвращает активную версию"""
+    version = db.query(func.max(QuestionBankVersion.version)).scalar()
+    if version is not None:
+        return version
+    return create_question_bank_version(db, default_questions())
+
+
+def backfill_answer_metrics(db: Session):
+    """
+    Один раз проставляет роли в метриках ответам, сохранённым до появления ролей:
+    по тексту вопроса банка по умолчанию (вопрос ответа — «Процесс: ...\\n\\n<текст>»)
+    """
+    if get_metadata(db, ANSWER_METRICS_BACKFILL_KEY):
+        return
+    updated = 0
+    for item in default_questions():
+        if item["metric"] is None:
+            continue
+        updated += db.execute(
+            update(InterviewAnswer)
+            .where(InterviewAnswer.metric.is_(None), InterviewAnswer.question.endswith(item["text"], autoescape=True))
+            .values(metric=item["metric"])
+        ).rowcount
+    set_metadata(db, ANSWER_METRICS_BACKFILL_KEY, True)
+    db.commit()
+    if updated:
+        print(f"Роли в метриках проставлены {updated} сохранённым ответам")
+
+
+def with_default_metrics(questions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Если ни у одного вопроса не указана роль в метриках (банк без ролей или сохранённый до них),
+    роли берутся у вопросов банка по умолчанию с тем же текстом — а не по номеру вопроса
+    """
+    if any(item.get("metric") for item in questions):
+        return questions
+    default_metrics = {item["text"]: item["metric"] for item in default_questions()}
+    return [{**item, "metric": default_metrics.get(item.get("text"))} for item in questions]
+
+
+def create_question_bank_version(db: Session, questions: List[Dict[str, Any]]) -> int:
+    """Сохраняет новую версию банка вопросов и делает её активной"""
+    if not questions:
+        raise ValueError("Банк вопросов не может быть пустым")
+    questions = with_default_metrics(questions)
+    metrics_seen = set()
+    for item in questions:
+        if not item.get("text"):
+            raise ValueError("Текст вопроса не может быть пустым")
+        if item.get("type") not in answer_rules.validators:
+            raise ValueError(f"Неизвестный тип валидатора: {item.get('type')}")
+        if float(item.get("weight", 1.0)) < 0:
+            raise ValueError("Вес вопроса не может быть отрицательным")
+        metric = item.get("metric")
+        if metric is not None:
+            if metric not in METRICS:
+                raise ValueError(f"Неизвестная роль вопроса в метриках: {metric}")
+            if metric in metrics_seen:
+                raise ValueError(f"Роль {metric} указана у нескольких вопросов")
+            metrics_seen.add(metric)
+
+    current = db.query(func.max(QuestionBankVersion.version)).scalar() or 0
+    row = QuestionBankVersion(version=current + 1, questions=json.dumps(questions, ensure_ascii=False))
+    db.add(row)
+    db.commit()
+    with _lock:
+        _questions_cache[row.version] = questions
+    return row.version
+
+
+def get_question_bank(db: Session) -> Tuple[int, List[Dict[str, Any]]]:
+    """Возвращает активную (последнюю) версию банка вопросов"""
+    version = db.query(func.max(QuestionBankVersion.version)).scalar()
+    if version is None:
+        return 0, default_questions()
+    with _lock:
+        questions = _questions_cache.get(version)
+    if questions is None:
+        row = db.query(QuestionBankVersion).filter(QuestionBankVersion.version == version).first()
+        questions = with_default_metrics(json.loads(row.questions))
+        with _lock:
+            _questions_cache[version] = questions
+    return version, questions
+
+
+def get_interview_plan(db: Session, processes: List[str]) -> InterviewPlan:
+    """Возвращает план интервью для набора процессов по активной версии банка вопросов"""
+    version, questions = get_question_bank(db)
+    key = (version, tuple(processes))
+    with _lock:
+        plan = _plan_cache.get(key)
+    if plan is None:
+        plan = InterviewPlan(version, processes, questions)
+        with _lock:
+            if len(_plan_cache) >= PLAN_CACHE_LIMIT:
+                _plan_cache.clear()
+            _plan_cache[key] = plan
+    return plan
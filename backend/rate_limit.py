@@ -0,0 +1,135 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from fastapi import HTTPException, Request
+
+import metrics
+
+# Ограничения для публичных эндпоинтов (/api/register, /api/chat)
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_IP_PER_MINUTE = float(os.getenv("RATE_LIMIT_IP_PER_MINUTE", "120"))
+RATE_LIMIT_IP_BURST = float(os.getenv("RATE_LIMIT_IP_BURST", "30"))
+RATE_LIMIT_NAME_PER_MINUTE = float(os.getenv("RATE_LIMIT_NAME_PER_MINUTE", "60"))
+RATE_LIMIT_NAME_BURST = float(os.getenv("RATE_LIMIT_NAME_BURST", "10"))
+# Сколько запросов к публичным эндпоинтам может обрабатываться одновременно
+PUBLIC_MAX_CONCURRENCY = int(os.getenv("PUBLIC_MAX_CONCURRENCY", "100"))
+# Брать IP клиента из X-Forwarded-For (только за доверенным прокси)
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "false").lower() == "true"
+# Сколько ключей (IP, ФИО) хранить; самые давние вытесняются
+RATE_LIMIT_MAX_KEYS = 10000
+
+
+class TokenBucketLimiter:
+    """Token bucket для каждого ключа: rate токенов в секунду, не больше burst про запас"""
+
+    def __init__(self, per_minute: float, burst: float, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # ключ -> (токены, время)
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str) -> Optional[float]:
+        """Забирает токен; возвращает None при успехе или сколько секунд ждать следующего токена"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                retry_after = None
+            else:
+                self._buckets[key] = (tokens, now)
+                retry_after = (1 - tokens) / self.rate if self.rate > 0 else 60.0
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+
+class ConcurrencyLimiter:
+    """Ограничение числа одновременно обрабатываемых запросов без очереди ожидания"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.in_flight >= self.limit:
+                return False
+            self.in_flight += 1
+            in_flight = self.in_flight
+        metrics.set_gauge("public_requests_in_flight", in_flight)
+        return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+            in_flight = self.in_flight
+        metrics.set_gauge("public_requests_in_flight", in_flight)
+
+
+ip_limiter = TokenBucketLimiter(RATE_LIMIT_IP_PER_MINUTE, RATE_LIMIT_IP_BURST)
+name_limiter = TokenBucketLimiter(RATE_LIMIT_NAME_PER_MINUTE, RATE_LIMIT_NAME_BURST)
+public_concurrency = ConcurrencyLimiter(PUBLIC_MAX_CONCURRENCY)
+
+
+def get_client_ip(request: Request) -> str:
+    if RATE_LIMIT_TRUST_PROXY:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def _too_many_requests(retry_after: float, counter: str):
+    metrics.increment(counter)
+    raise HTTPException(
+        status_code=429,
+        detail="Слишком много запросов, попробуйте позже",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
+def mark_idempotent_replay(request: Request):
+    """Помечает запрос как повтор, ответ на который уже есть в кэше: лимиты к нему не применяются"""
+    request.state.idempotent_replay = True
+
+
+async def public_endpoint_guard(request: Request):
+    """
+    Зависимость для публичных эндпоинтов: лимит по IP и общий лимит одновременных запросов.
+    При превышении сразу отвечает 429/503 с Retry-After, а не ставит запрос в очередь.
+    Повтор по известному ключу идемпотентности (см. mark_idempotent_replay) токен не расходует.
+    """
+    if not RATE_LIMIT_ENABLED or getattr(request.state, "idempotent_replay", False):
+        yield
+        return
+    retry_after = ip_limiter.acquire(get_client_ip(request))
+    if retry_after is not None:
+        _too_many_requests(retry_after, "rate_limited_ip")
+    if not public_concurrency.try_acquire():
+        metrics.increment("concurrency_rejected")
+        raise HTTPException(
+            status_code=503,
+            detail="Сервис перегружен, попробуйте позже",
+            headers={"Retry-After": "1"}
+        )
+    try:
+        yield
+    finally:
+        public_concurrency.release()
+
+
+def check_name_rate_limit(full_name: str):
+    """Лимит запросов по ФИО кандидата"""
+    if not RATE_LIMIT_ENABLED:
+        return
+    retry_after = name_limiter.acquire(full_name.strip().lower())
+    if retry_after is not None:
+        _too_many_requests(retry_after, "rate_limited_name")
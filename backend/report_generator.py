@@ -3,6 +3,8 @@ import io
 from datetime import datetime
 from sqlalchemy.orm import Session
 from models import Candidate, InterviewAnswer
+from process_metrics import calculate_process_metrics
+from answer_archive import load_archived_answers
 from reportlab.lib.pagesizes import A4
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -10,6 +12,7 @@ from reportlab.lib.units import inch
 from reportlab.lib import colors
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, PatternFill
+from openpyxl.utils import get_column_letter
 import tempfile
 
 def get_candidate_report_data(db: Session, candidate_id: int):
@@ -24,6 +27,9 @@ def get_candidate_report_data(db: Session, candidate_id: int):
         InterviewAnswer.is_valid == True
     ).all()
     
+    # Добавляем ответы, перенесённые в архив
+    answers.extend(a for a in load_archived_answers(db, candidate_id) if a.is_valid)
+    
     # Группируем ответы по процессам
     processes_data = {}
     for answer in answers:
@@ -42,45 +48,6 @@ def get_candidate_report_data(db: Session, candidate_id: int):
         'answers': answers
     }
 
-def calculate_process_metrics(answers):
-    """Рассчитывает метрики процесса"""
-    iteration_time = 0
-    frequency = 0
-    session_count = 0
-    tools = []
-    
-    for answer in answers:
-        if answer.question_number == 2:  # Время итерации
-            import re
-            numbers = re.findall(r'\d+', answer.answer)
-            if numbers:
-                iteration_time = float(numbers[0])
-        elif answer.question_number == 3:  # Частота
-            import re
-            numbers = re.findall(r'\d+', answer.answer)
-            if numbers:
-                frequency = float(numbers[0])
-        elif answer.question_number == 4:  # Количество повторов
-            import re
-            numbers = re.findall(r'\d+', answer.answer)
-            if numbers:
-                session_count = float(numbers[0])
-        elif answer.question_number == 6:  # Инструменты
-            tools.append(answer.answer)
-    
-    total_time = iteration_time * frequency * session_count
-    rate_per_minute = float(os.getenv("PROCESS_RATE_PER_MINUTE", "0.5"))
-    process_cost = total_time * rate_per_minute
-    
-    return {
-        'iteration_time': iteration_time,
-        'frequency': frequency,
-        'session_count': session_count,
-        'total_time': total_time,
-        'process_cost': process_cost,
-        'tools': tools
-    }
-
 def generate_pdf_report(report_data, output_path):
     """Генерирует PDF отчёт"""
     doc = SimpleDocTemplate(output_path, pagesize=A4)
@@ -246,9 +213,10 @@ def generate_excel_report(report_data, output_path):
     ws[f'A{row}'].font = normal_font
     
     # Автоподбор ширины колонок
-    for column in ws.columns:
+    for column_index, column in enumerate(ws.columns, start=1):
         max_length = 0
-        column_letter = column[0].column_letter
+        # Первая ячейка колонки может быть объединённой (MergedCell без column_letter)
+        column_letter = get_column_letter(column_index)
         for cell in column:
             try:
                 if len(str(cell.value)) > max_length:
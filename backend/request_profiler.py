@@ -0,0 +1,332 @@
+import contextvars
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Set
+from urllib.parse import parse_qs
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import metrics
+from auth import verify_token, ADMIN_USERNAME
+
+# Профилирование админских запросов по требованию: заголовок X-Profile: 1, параметр ?profile=1
+# или доля PROFILE_SAMPLE_RATE всех админских запросов. Снимается cProfile и все SQL-запросы
+# с временем выполнения (работа в пуле потоков — через run_in_threadpool_profiled);
+# результаты хранятся в PROFILE_DIR (не больше PROFILE_MAX_ENTRIES последних).
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_MAX_ENTRIES = int(os.getenv("PROFILE_MAX_ENTRIES", "50"))
+PROFILE_PATH_PREFIX = "/api/admin/"
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY_FLAG = "profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+PROFILE_TOP_FUNCTIONS = 40
+PROFILE_MAX_SQL = 500
+SQL_TEXT_LIMIT = 2000
+
+_profile_id_regex = re.compile(r"^[0-9a-f]{12}$")
+_active_profile: contextvars.ContextVar = contextvars.ContextVar("active_request_profile", default=None)
+# cProfile работает через sys.setprofile потока: одновременно профилируем только один запрос,
+# остальные в это время получают только SQL-часть профиля
+_cpu_profiler_lock = threading.Lock()
+# Запросы воркера, выполняющиеся сейчас, и активные профили (всё — в потоке event loop).
+# cProfile event loop видит и чужие корутины, поэтому профиль считает пересёкшиеся с ним запросы
+_in_flight_requests = 0
+_active_profiles: Set["RequestProfile"] = set()
+
+
+class RequestProfile:
+    """Профиль одного запроса: cProfile и SQL-запросы с временем выполнения"""
+
+    def __init__(self, method: str, path: str, reason: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.reason = reason
+        self.started_at = datetime.now(timezone.utc)
+        self.duration_ms = 0.0
+        self.status_code: Optional[int] = None
+        self.profiler: Optional[cProfile.Profile] = None
+        # Профили работы запроса в пуле потоков (run_in_threadpool_profiled)
+        self.worker_profilers: List[cProfile.Profile] = []
+        # Сколько других запросов воркера выполнялось одновременно с этим
+        self.concurrent_requests = 0
+        self.sql: List[Dict[str, Any]] = []
+        self.sql_count = 0
+        self.sql_ms = 0.0
+        self._lock = threading.Lock()
+
+    def add_sql(self, statement: str, ms: float, rows: int, executemany: bool):
+        # SQL может выполняться и в пуле потоков (run_in_threadpool), поэтому под блокировкой
+        with self._lock:
+            self.sql_count += 1
+            self.sql_ms += ms
+            if len(self.sql) < PROFILE_MAX_SQL:
+                self.sql.append({
+                    "statement": statement[:SQL_TEXT_LIMIT],
+                    "ms": round(ms, 3),
+                    "rows": rows,
+                    "executemany": executemany
+                })
+
+    def add_worker_profiler(self, profiler: cProfile.Profile):
+        with self._lock:
+            self.worker_profilers.append(profiler)
+
+    def stats(self, stream=None) -> Optional[pstats.Stats]:
+        """Общая статистика cProfile: поток event loop и работа запроса в пуле потоков"""
+        if self.profiler is None:
+            return None
+        return pstats.Stats(self.profiler, *self.worker_profilers, stream=stream)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "reason": self.reason,
+            "status_code": self.status_code,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration_ms, 1),
+            "sql_count": self.sql_count,
+            "sql_ms": round(self.sql_ms, 1),
+            "cpu_profile": self.profiler is not None,
+            "concurrent_requests": self.concurrent_requests
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = self.summary()
+        result["sql"] = self.sql
+        result["sql_truncated"] = self.sql_count > len(self.sql)
+        result["functions"] = []
+        result["stats_text"] = ""
+        if self.profiler is not None:
+            stats = self.stats()
+            functions = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+            result["functions"] = [
+                {
+                    "function": f"{name} ({os.path.basename(file_name)}:{line})",
+                    "ncalls": ncalls,
+                    "tottime_ms": round(tottime * 1000, 3),
+                    "cumtime_ms": round(cumtime * 1000, 3)
+                }
+                for (file_name, line, name), (_, ncalls, tottime, cumtime, _) in functions[:PROFILE_TOP_FUNCTIONS]
+            ]
+            output = io.StringIO()
+            self.stats(stream=output).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+            result["stats_text"] = output.getvalue()
+        return result
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active_profile.get() is not None:
+        conn.info.setdefault("profile_query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _active_profile.get()
+    started = conn.info.get("profile_query_started")
+    if profile is None or not started:
+        return
+    ms = (time.perf_counter() - started.pop()) * 1000
+    profile.add_sql(statement, ms, cursor.rowcount, executemany)
+
+
+async def run_in_threadpool_profiled(func: Callable, *args, **kwargs):
+    """
+    run_in_threadpool, при котором работа в потоке пула попадает в cProfile текущего запроса
+    (cProfile event loop потоки пула не видит)
+    """
+    profile = _active_profile.get()
+    if profile is None or profile.profiler is None:
+        return await run_in_threadpool(func, *args, **kwargs)
+
+    def run():
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            profile.add_worker_profiler(profiler)
+
+    return await run_in_threadpool(run)
+
+
+def instrument_engine(engine: Engine):
+    """Подключает замер SQL-запросов к движку (работает только внутри профилируемого запроса)"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class ProfileStore:
+    """Профили на диске: <id>.json (сводка, SQL, топ функций) и <id>.prof (pstats для snakeviz и т.п.)"""
+
+    def __init__(self, directory: str = PROFILE_DIR, max_entries: int = PROFILE_MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+    def _path(self, profile_id: str, extension: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.{extension}")
+
+    def save(self, profile: RequestProfile):
+        data = profile.to_dict()
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._path(profile.id, "json"), "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            if profile.profiler is not None:
+                profile.stats().dump_stats(self._path(profile.id, "prof"))
+            self._prune()
+
+    def _prune(self):
+        """Удаляет самые старые профили сверх max_entries"""
+        entries = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith(".json")),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        for entry in entries[:max(len(entries) - self.max_entries, 0)]:
+            profile_id = entry.name[:-len(".json")]
+            for extension in ("json", "prof"):
+                path = self._path(profile_id, extension)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Сводки сохранённых профилей, новые сверху"""
+        if not os.path.isdir(self.directory):
+            return []
+        entries = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith(".json")),
+            key=lambda entry: entry.stat().st_mtime,
+            reverse=True
+        )
+        result = []
+        for entry in entries:
+            try:
+                with open(entry.path, encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue  # файл мог быть удалён или ещё дописывается другим воркером
+            result.append({key: data.get(key) for key in (
+                "id", "method", "path", "reason", "status_code", "started_at",
+                "duration_ms", "sql_count", "sql_ms", "cpu_profile", "concurrent_requests"
+            )})
+        return result
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        if not _profile_id_regex.match(profile_id):
+            return None
+        path = self._path(profile_id, "json")
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def pstats_path(self, profile_id: str) -> Optional[str]:
+        if not _profile_id_regex.match(profile_id):
+            return None
+        path = self._path(profile_id, "prof")
+        return path if os.path.exists(path) else None
+
+
+profile_store = ProfileStore()
+
+
+def _is_admin(authorization: bytes) -> bool:
+    scheme, _, token = authorization.decode("latin-1").partition(" ")
+    return scheme.lower() == "bearer" and verify_token(token.strip()) == ADMIN_USERNAME
+
+
+def _is_enabled_flag(value: str) -> bool:
+    return value.lower() in ("1", "true", "yes")
+
+
+class RequestProfilerMiddleware:
+    """
+    ASGI-middleware профилирования админских запросов. Чистый ASGI, а не BaseHTTPMiddleware:
+    так в профиль попадает и отдача тела потоковых ответов (экспорт).
+    Профилируются только запросы с валидным админским токеном; id профиля — в заголовке X-Profile-Id.
+    """
+
+    def __init__(self, app, store: ProfileStore = profile_store, sample_rate: float = PROFILE_SAMPLE_RATE):
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+
+    def _profile_reason(self, scope) -> Optional[str]:
+        headers = dict(scope["headers"])
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        if _is_enabled_flag(headers.get(PROFILE_HEADER, b"").decode("latin-1")) or \
+                _is_enabled_flag(query.get(PROFILE_QUERY_FLAG, [""])[0]):
+            reason = "requested"
+        elif self.sample_rate > 0 and random.random() < self.sample_rate:
+            reason = "sampled"
+        else:
+            return None
+        return reason if _is_admin(headers.get(b"authorization", b"")) else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        global _in_flight_requests
+        for active in _active_profiles:
+            active.concurrent_requests += 1
+        _in_flight_requests += 1
+        try:
+            await self._handle(scope, receive, send)
+        finally:
+            _in_flight_requests -= 1
+
+    async def _handle(self, scope, receive, send):
+        if not scope["path"].startswith(PROFILE_PATH_PREFIX):
+            await self.app(scope, receive, send)
+            return
+        reason = self._profile_reason(scope)
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"], reason)
+        # Запросы, начавшиеся раньше и ещё не завершённые (кроме самого профилируемого)
+        profile.concurrent_requests = _in_flight_requests - 1
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (PROFILE_ID_HEADER, profile.id.encode())]}
+            await send(message)
+
+        cpu_profiling = _cpu_profiler_lock.acquire(blocking=False)
+        if cpu_profiling:
+            profile.profiler = cProfile.Profile()
+            profile.profiler.enable()
+        token = _active_profile.set(profile)
+        _active_profiles.add(profile)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profile.duration_ms = (time.perf_counter() - started) * 1000
+            _active_profiles.discard(profile)
+            _active_profile.reset(token)
+            if cpu_profiling:
+                profile.profiler.disable()
+                _cpu_profiler_lock.release()
+            metrics.increment("requests_profiled")
+            try:
+                await run_in_threadpool(self.store.save, profile)
+            except OSError as e:
+                print(f"Не удалось сохранить профиль {profile.id}: {e}")
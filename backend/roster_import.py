@@ -0,0 +1,287 @@
+import codecs
+import csv
+import io
+import os
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy.orm import Session
+
+from models import Candidate
+from data_version import bump_data_generation
+from delta_export import hold_delta_watermark, release_delta_watermark
+from process_catalog import sync_candidate_processes
+
+# Ограничения загрузки списка кандидатов
+ROSTER_MAX_UPLOAD_MB = float(os.getenv("ROSTER_MAX_UPLOAD_MB", "20"))
+ROSTER_MAX_UPLOAD_BYTES = int(ROSTER_MAX_UPLOAD_MB * 1024 * 1024)
+# Запас на заголовки и границы multipart поверх самого файла (для проверки Content-Length)
+ROSTER_MULTIPART_OVERHEAD_BYTES = 64 * 1024
+ROSTER_CHUNK_SIZE = 64 * 1024
+ROSTER_BATCH_SIZE = int(os.getenv("ROSTER_BATCH_SIZE", "1000"))
+# Сколько ошибок строк возвращать в ответе (остальные только считаются)
+ROSTER_MAX_REPORTED_ERRORS = 100
+
+REQUIRED_COLUMNS = ("ФИО", "Процессы")
+NAME_MAX_LENGTH = 255  # Candidate.full_name = String(255)
+CANDIDATE_ENCODINGS = ("utf-8", "cp1251")
+CANDIDATE_DELIMITERS = ",;\t"
+ROSTER_EXTENSIONS = (".csv", ".xlsx")
+
+
+class RosterImportError(Exception):
+    """Файл списка кандидатов не может быть импортирован целиком"""
+
+
+class SizeLimitedReader(io.RawIOBase):
+    """Читает файл по частям и прерывает чтение при превышении лимита размера"""
+
+    def __init__(self, raw: BinaryIO, max_bytes: int):
+        self.raw = raw
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.raw.read(min(len(buffer), ROSTER_CHUNK_SIZE))
+        self.bytes_read += len(data)
+        if self.bytes_read > self.max_bytes:
+            raise RosterImportError(f"Файл больше допустимого размера ({self.max_bytes / 1024 / 1024:g} МБ)")
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def sniff_encoding(sample: bytes) -> str:
+    """
+    Определяет кодировку по началу файла: UTF-8 (с BOM или без) или cp1251 (Excel).
+    Обязательные колонки названы по-русски, поэтому кодировку однозначно задаёт уже заголовок.
+    Если файл перестаёт читаться дальше, строки в нём в разных кодировках — такой файл отклоняется.
+    """
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    for encoding in CANDIDATE_ENCODINGS:
+        try:
+            # final=False: обрезанный на границе чанка символ не считается ошибкой
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    raise RosterImportError("Не удалось определить кодировку файла (ожидается UTF-8 или Windows-1251)")
+
+
+def sniff_delimiter(sample_text: str) -> str:
+    """Определяет разделитель CSV (запятая, точка с запятой или табуляция)"""
+    header = sample_text.splitlines()[0] if sample_text else ""
+    try:
+        return csv.Sniffer().sniff(sample_text, delimiters=CANDIDATE_DELIMITERS).delimiter
+    except csv.Error:
+        # Sniffer не справился (например, одна строка) — выбираем самый частый разделитель в заголовке
+        return max(CANDIDATE_DELIMITERS, key=header.count) if header else ","
+
+
+def iter_csv_rows(raw: BinaryIO, max_bytes: Optional[int] = None) -> Tuple[Dict[str, str], Iterator[Tuple[int, Dict[str, Any]]]]:
+    """
+    Потоково читает CSV. Возвращает параметры файла (кодировка, разделитель)
+    и итератор (номер строки, словарь значений) — файл целиком в память не загружается.
+    """
+    if max_bytes is None:
+        max_bytes = ROSTER_MAX_UPLOAD_BYTES
+    sample = raw.read(ROSTER_CHUNK_SIZE)
+    raw.seek(0)
+    encoding = sniff_encoding(sample)
+    sample_text = codecs.getincrementaldecoder(encoding)(errors="replace").decode(sample, final=False)
+    delimiter = sniff_delimiter(sample_text)
+
+    reader = io.BufferedReader(SizeLimitedReader(raw, max_bytes), ROSTER_CHUNK_SIZE)
+    text = io.TextIOWrapper(reader, encoding=encoding, newline="")
+    csv_reader = csv.DictReader(text, delimiter=delimiter)
+
+    try:
+        header = csv_reader.fieldnames or []
+    except UnicodeDecodeError:
+        raise RosterImportError(f"Файл не соответствует кодировке {encoding}")
+    header = [(name or "").strip() for name in header]
+    csv_reader.fieldnames = header
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        raise RosterImportError(f"Файл должен содержать колонки {', '.join(repr(c) for c in REQUIRED_COLUMNS)}")
+
+    def rows():
+        try:
+            for row in csv_reader:
+                # line_num — номер последней прочитанной физической строки файла
+                yield csv_reader.line_num, row
+        except UnicodeDecodeError:
+            # Текст декодируется с упреждением, поэтому известна только последняя прочитанная строка
+            raise RosterImportError(
+                f"Файл не соответствует кодировке {encoding} (после строки {csv_reader.line_num}): "
+                f"похоже, часть строк сохранена в другой кодировке. Сохраните файл целиком в UTF-8"
+            )
+        except csv.Error as e:
+            raise RosterImportError(f"Ошибка разбора CSV (строка {csv_reader.line_num}): {e}")
+
+    return {"format": "csv", "encoding": encoding, "delimiter": delimiter}, rows()
+
+
+def iter_xlsx_rows(raw: BinaryIO, max_bytes: Optional[int] = None) -> Tuple[Dict[str, str], Iterator[Tuple[int, Dict[str, Any]]]]:
+    """
+    Потоково читает первый лист XLSX в режиме read-only openpyxl:
+    строки листа разбираются по мере обхода и не материализуются целиком.
+    """
+    if max_bytes is None:
+        max_bytes = ROSTER_MAX_UPLOAD_BYTES
+    # XLSX — zip-архив, читать его можно только с произвольным доступом, поэтому размер проверяем заранее
+    raw.seek(0, os.SEEK_END)
+    size = raw.tell()
+    raw.seek(0)
+    if size > max_bytes:
+        raise RosterImportError(f"Файл больше допустимого размера ({max_bytes / 1024 / 1024:g} МБ)")
+
+    from openpyxl import load_workbook
+    try:
+        workbook = load_workbook(raw, read_only=True, data_only=True)
+    except Exception as e:
+        raise RosterImportError(f"Не удалось открыть XLSX файл: {e}")
+    sheet = workbook.active
+    sheet_rows = sheet.iter_rows(values_only=True)
+
+    first_row = next(sheet_rows, None) or ()
+    header = [str(value).strip() if value is not None else "" for value in first_row]
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        workbook.close()
+        raise RosterImportError(f"Файл должен содержать колонки {', '.join(repr(c) for c in REQUIRED_COLUMNS)}")
+
+    def rows():
+        try:
+            for line_number, values in enumerate(sheet_rows, start=2):
+                # Пустые строки в конце листа — обычное дело для Excel, пропускаем молча
+                if values is None or all(value is None or str(value).strip() == "" for value in values):
+                    continue
+                row = {
+                    column: values[index] if index < len(values) else None
+                    for index, column in enumerate(header) if column
+                }
+                extra = [value for value in values[len(header):] if value is not None and str(value).strip()]
+                if extra:
+                    row[None] = extra
+                yield line_number, row
+        finally:
+            workbook.close()
+
+    return {"format": "xlsx", "sheet": sheet.title}, rows()
+
+
+def validate_roster_row(row: Dict[str, Any]) -> Tuple[Optional[Tuple[str, str]], Optional[str]]:
+    """Проверяет строку списка; возвращает ((ФИО, процессы), None) или (None, ошибка)"""
+    if None in row:
+        return None, "лишние значения в строке (проверьте разделитель и кавычки)"
+    full_name = str(row.get("ФИО") or "").strip()
+    processes = row.get("Процессы")
+    processes = "" if processes is None else str(processes).strip()
+    if not full_name:
+        return None, "пустое ФИО"
+    if len(full_name) > NAME_MAX_LENGTH:
+        return None, f"ФИО длиннее {NAME_MAX_LENGTH} символов"
+    # Нормализуем список процессов: без пустых элементов и лишних пробелов
+    processes = ", ".join(p.strip() for p in processes.split(",") if p.strip())
+    return (full_name, processes), None
+
+
+def upsert_candidates(db: Session, batch: List[Tuple[str, str]]) -> Tuple[int, int, List[Candidate]]:
+    """Создаёт или обновляет пачку кандидатов; возвращает (создано, обновлено, изменённые кандидаты)"""
+    latest: Dict[str, str] = {}
+    for full_name, processes in batch:
+        latest[full_name] = processes  # при повторе ФИО в файле побеждает последняя строка
+
+    existing = {
+        candidate.full_name: candidate
+        for candidate in db.query(Candidate).filter(Candidate.full_name.in_(list(latest)))
+    }
+    created = updated = 0
+    changed: List[Candidate] = []
+    for full_name, processes in latest.items():
+        candidate = existing.get(full_name)
+        if candidate is None:
+            candidate = Candidate(full_name=full_name, processes=processes)
+            db.add(candidate)
+            changed.append(candidate)
+            created += 1
+        elif candidate.processes != processes:
+            candidate.processes = processes
+            changed.append(candidate)
+            updated += 1
+    return created, updated, changed
+
+
+def import_roster_rows(db: Session, rows: Iterator[Tuple[int, Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Импортирует строки списка кандидатов пачками. Всё выполняется в одной транзакции:
+    при фатальной ошибке файла изменения откатываются, ошибки отдельных строк только собираются.
+    На время транзакции курсор инкрементальной выгрузки удерживается у её начала.
+    """
+    summary: Dict[str, Any] = {"rows": 0, "created": 0, "updated": 0, "error_count": 0, "errors": []}
+    batch: List[Tuple[str, str]] = []
+
+    def flush():
+        created, updated, changed = upsert_candidates(db, batch)
+        summary["created"] += created
+        summary["updated"] += updated
+        db.flush()
+        # Каталог процессов обновляется вместе со списком кандидатов
+        sync_candidate_processes(db, changed)
+        # Отпускаем объекты пачки, чтобы память не росла с размером файла
+        db.expunge_all()
+        batch.clear()
+
+    hold = hold_delta_watermark(db)
+    try:
+        for line_number, row in rows:
+            summary["rows"] += 1
+            item, error = validate_roster_row(row)
+            if error:
+                summary["error_count"] += 1
+                if len(summary["errors"]) < ROSTER_MAX_REPORTED_ERRORS:
+                    summary["errors"].append({"line": line_number, "error": error})
+                continue
+            batch.append(item)
+            if len(batch) >= ROSTER_BATCH_SIZE:
+                flush()
+        if batch:
+            flush()
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        release_delta_watermark(db, hold)
+    # Кэши админки сбрасываются по версии данных
+    bump_data_generation(db)
+    return summary
+
+
+def import_roster_csv(db: Session, raw: BinaryIO, max_bytes: Optional[int] = None) -> Dict[str, Any]:
+    """Импортирует список кандидатов из CSV-потока"""
+    return import_roster_file(db, raw, "roster.csv", max_bytes)
+
+
+def is_roster_file(filename: str) -> bool:
+    """Проверяет, поддерживается ли формат файла списка кандидатов"""
+    return filename.lower().endswith(ROSTER_EXTENSIONS)
+
+
+def iter_roster_rows(raw: BinaryIO, filename: str, max_bytes: Optional[int] = None):
+    """Выбирает потоковый парсер по расширению файла (.csv или .xlsx)"""
+    if filename.lower().endswith(".xlsx"):
+        return iter_xlsx_rows(raw, max_bytes)
+    if filename.lower().endswith(".csv"):
+        return iter_csv_rows(raw, max_bytes)
+    raise RosterImportError("Файл должен быть в формате CSV или XLSX")
+
+
+def import_roster_file(db: Session, raw: BinaryIO, filename: str, max_bytes: Optional[int] = None) -> Dict[str, Any]:
+    """Импортирует список кандидатов из CSV или XLSX"""
+    file_info, rows = iter_roster_rows(raw, filename, max_bytes)
+    summary = import_roster_rows(db, rows)
+    summary.update(file_info)
+    return summary
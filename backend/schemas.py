@@ -13,6 +13,8 @@ class CandidateResponse(BaseModel):
 class ChatRequest(BaseModel):
     full_name: str
     message: str
+    # Ключ идемпотентности (можно передать и заголовком Idempotency-Key)
+    idempotency_key: Optional[str] = None
 
 class ChatResponse(BaseModel):
     bot_message: str
@@ -45,3 +47,60 @@ class AdminStats(BaseModel):
     completed_interviews: int
     in_progress_interviews: int
     not_started_interviews: int
+
+class QuestionBankItem(BaseModel):
+    text: str
+    type: str = "free_text"
+    weight: float = 1.0
+    # Роль в расчёте метрик: iteration_time, frequency, session_count, tools или None
+    metric: Optional[str] = None
+
+class QuestionBankIn(BaseModel):
+    questions: List[QuestionBankItem]
+
+class QuestionBankOut(BaseModel):
+    version: int
+    questions: List[QuestionBankItem]
+
+class ProcessRollupOut(BaseModel):
+    process: str
+    assigned_candidates: int
+    respondents: int
+    median_iteration_time: Optional[float] = None
+    median_frequency: Optional[float] = None
+    median_session_count: Optional[float] = None
+    total_minutes: float
+    estimated_cost_rub: float
+
+class AnswerSearchResult(BaseModel):
+    answer_id: int
+    full_name: str
+    process: str
+    question_number: int
+    is_valid: bool
+    snippet: str
+    created_at: Optional[datetime] = None
+
+class AnswerSearchPage(BaseModel):
+    total: int
+    page: int
+    page_size: int
+    results: List[AnswerSearchResult]
+
+class AnswerArchiveIn(BaseModel):
+    # Архивируются кандидаты, все ответы которых старше этой даты
+    older_than: datetime
+
+class AnswerArchiveRun(BaseModel):
+    archive_id: Optional[int] = None
+    file_name: Optional[str] = None
+    answers_count: int
+    candidates_count: int
+
+class AnswerArchiveOut(BaseModel):
+    id: int
+    file_name: str
+    cutoff: datetime
+    answers_count: int
+    candidates_count: int
+    created_at: Optional[datetime] = None
@@ -0,0 +1,307 @@
+import csv
+import os
+import tempfile
+import time
+from datetime import datetime
+from itertools import groupby
+from typing import Any, Dict, Iterable, Iterator, List
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import inch
+from reportlab.lib import colors
+from reportlab.pdfgen import canvas as pdf_canvas
+from reportlab.platypus import Table, TableStyle
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+
+import metrics
+from models import Candidate, InterviewAnswer
+from admin_utils import get_interview_status
+from answer_archive import iter_archived_candidates
+from process_catalog import split_processes
+from process_metrics import calculate_process_metrics
+
+# Сводный отчёт по всем сотрудникам и процессам: один потоковый проход по кандидатам и ответам,
+# строки сотрудников складываются во временный CSV и выводятся постранично
+SUMMARY_BATCH_SIZE = 5000
+SUMMARY_ROWS_PER_PAGE = 40
+SUMMARY_REPORT_FORMATS = {
+    "pdf": "application/pdf",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+STATUSES = ("пройдено", "в процессе", "не начато")
+
+CANDIDATE_HEADER = ["ФИО", "Процессы", "Статус", "Прогресс %", "Общее время (мин)", "Стоимость (₽)"]
+PROCESS_HEADER = ["Процесс", "Назначено", "Ответили", "Охват %", "Общее время (мин)", "Стоимость (₽)"]
+
+
+class SummaryAggregate:
+    """Итоги по всем сотрудникам и по каждому процессу"""
+
+    def __init__(self):
+        self.candidates = 0
+        self.statuses = {status: 0 for status in STATUSES}
+        self.total_time = 0.0
+        self.total_cost = 0.0
+        self.processes: Dict[str, Dict[str, float]] = {}
+
+    def _process(self, name: str) -> Dict[str, float]:
+        if name not in self.processes:
+            self.processes[name] = {"assigned": 0, "respondents": 0, "total_time": 0.0, "cost": 0.0}
+        return self.processes[name]
+
+    def add_candidate(self, status: str, assigned_processes: List[str], process_metrics: Dict[str, Dict[str, Any]]):
+        self.candidates += 1
+        self.statuses[status] += 1
+        for name in assigned_processes:
+            self._process(name)["assigned"] += 1
+        for name, metrics_row in process_metrics.items():
+            process = self._process(name)
+            process["respondents"] += 1
+            process["total_time"] += metrics_row["total_time"]
+            process["cost"] += metrics_row["process_cost"]
+            self.total_time += metrics_row["total_time"]
+            self.total_cost += metrics_row["process_cost"]
+
+    @property
+    def completion_rate(self) -> float:
+        return self.statuses["пройдено"] / self.candidates * 100 if self.candidates else 0.0
+
+    def totals_rows(self) -> List[List[Any]]:
+        return [
+            ["Сотрудников", self.candidates],
+            ["Интервью пройдено", self.statuses["пройдено"]],
+            ["Интервью в процессе", self.statuses["в процессе"]],
+            ["Интервью не начато", self.statuses["не начато"]],
+            ["Доля завершивших %", round(self.completion_rate, 1)],
+            ["Общее время процессов (мин)", round(self.total_time, 1)],
+            ["Общая стоимость процессов (₽)", round(self.total_cost, 2)],
+        ]
+
+    def process_rows(self) -> List[List[Any]]:
+        rows = []
+        for name, process in sorted(self.processes.items(), key=lambda item: item[1]["cost"], reverse=True):
+            coverage = process["respondents"] / process["assigned"] * 100 if process["assigned"] else 0.0
+            rows.append([
+                name, int(process["assigned"]), int(process["respondents"]), round(coverage, 1),
+                round(process["total_time"], 1), round(process["cost"], 2)
+            ])
+        return rows
+
+
+def iter_candidate_answer_groups(db: Session, batch_size: int = SUMMARY_BATCH_SIZE) -> Iterator[tuple]:
+    """
+    Один потоковый запрос: кандидаты с их ответами (LEFT JOIN — без ответов тоже),
+    упорядоченные по кандидату. Возвращает (кандидат, список его ответов).
+    """
+    query = (
+        select(
+            Candidate.id, Candidate.full_name, Candidate.processes,
+            InterviewAnswer.process.label("process"), InterviewAnswer.question_number, InterviewAnswer.metric,
+            InterviewAnswer.answer, InterviewAnswer.is_valid
+        )
+        .outerjoin(InterviewAnswer, InterviewAnswer.candidate_id == Candidate.id)
+        .order_by(Candidate.id, InterviewAnswer.id)
+        .execution_options(stream_results=True, yield_per=batch_size)
+    )
+    rows = (row for partition in db.execute(query).partitions() for row in partition)
+    for _, candidate_rows in groupby(rows, key=lambda row: row.id):
+        candidate_rows = list(candidate_rows)
+        yield candidate_rows[0], [row for row in candidate_rows if row.process is not None]
+
+
+def aggregate_summary(db: Session, spool) -> SummaryAggregate:
+    """Считает итоги одним проходом; строки сотрудников пишет в spool (CSV)"""
+    aggregate = SummaryAggregate()
+    # Оба потока упорядочены по id кандидата — архивные данные подтягиваются слиянием
+    archived = iter_archived_candidates(db)
+    archived_candidate = next(archived, None)
+    writer = csv.writer(spool)
+
+    for candidate, answers in iter_candidate_answer_groups(db):
+        while archived_candidate is not None and archived_candidate[0] < candidate.id:
+            archived_candidate = next(archived, None)
+        archived_answers_count, archived_valid_count, archived_answers = 0, 0, []
+        if archived_candidate is not None and archived_candidate[0] == candidate.id:
+            _, archived_answers_count, archived_valid_count, archived_answers = archived_candidate
+
+        total_answers = len(answers) + archived_answers_count
+        valid_answers = [answer for answer in answers if answer.is_valid]
+        valid_count = len(valid_answers) + archived_valid_count
+        status, progress_percent = get_interview_status(total_answers, valid_count)
+
+        # Архивные ответы идут первыми: более новые ответы горячей таблицы перекрывают их
+        # по каждой метрике, а метрики, на которые ответ есть только в архиве, сохраняются
+        merged_answers = archived_answers + valid_answers
+        merged_answers.sort(key=lambda answer: answer.process)
+        process_metrics = {
+            process: calculate_process_metrics(list(process_answers))
+            for process, process_answers in groupby(merged_answers, key=lambda answer: answer.process)
+        }
+
+        aggregate.add_candidate(status, split_processes(candidate.processes), process_metrics)
+        writer.writerow([
+            candidate.full_name, candidate.processes or "", status, progress_percent,
+            round(sum(m["total_time"] for m in process_metrics.values()), 1),
+            round(sum(m["process_cost"] for m in process_metrics.values()), 2)
+        ])
+    return aggregate
+
+
+def _iter_spooled_rows(spool) -> Iterator[List[Any]]:
+    spool.seek(0)
+    for full_name, processes, status, progress, total_time, cost in csv.reader(spool):
+        yield [full_name, processes, status, int(progress), float(total_time), float(cost)]
+
+
+def _pages(rows: Iterable[List[Any]], size: int) -> Iterator[List[List[Any]]]:
+    page: List[List[Any]] = []
+    for row in rows:
+        page.append(row)
+        if len(page) >= size:
+            yield page
+            page = []
+    if page:
+        yield page
+
+
+def _shorten(value: Any, limit: int) -> str:
+    text = str(value)
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.black)
+])
+
+
+class _PdfPages:
+    """Рисует таблицы прямо на canvas, страница за страницей: в памяти только текущая страница"""
+
+    def __init__(self, output_path: str):
+        self.canvas = pdf_canvas.Canvas(output_path, pagesize=A4)
+        self.width, self.height = A4
+        self.margin = 0.6 * inch
+        self.y = self.height - self.margin
+        self.page_started = False
+
+    def new_page(self):
+        if self.page_started:
+            self.canvas.showPage()
+        self.y = self.height - self.margin
+        self.page_started = True
+
+    def heading(self, text: str, size: int = 12):
+        self.canvas.setFont("Helvetica-Bold", size)
+        self.canvas.drawString(self.margin, self.y - size, text)
+        self.y -= size + 10
+
+    def text(self, text: str):
+        self.canvas.setFont("Helvetica", 9)
+        self.canvas.drawString(self.margin, self.y - 9, text)
+        self.y -= 15
+
+    def table(self, rows: List[List[Any]], col_widths: List[float]):
+        table = Table(rows, colWidths=col_widths)
+        table.setStyle(TABLE_STYLE)
+        _, table_height = table.wrapOn(self.canvas, self.width - 2 * self.margin, self.y)
+        table.drawOn(self.canvas, self.margin, self.y - table_height)
+        self.y -= table_height + 15
+
+    def paged_table(self, title: str, header: List[str], rows: Iterable[List[Any]], col_widths: List[float],
+                    limits: List[int]):
+        for number, page in enumerate(_pages(rows, SUMMARY_ROWS_PER_PAGE), start=1):
+            self.new_page()
+            self.heading(f"{title} (стр. {number})", size=11)
+            self.table([header] + [[_shorten(v, limit) for v, limit in zip(row, limits)] for row in page], col_widths)
+
+    def save(self):
+        self.canvas.save()
+
+
+def render_summary_pdf(aggregate: SummaryAggregate, spool, output_path: str):
+    """PDF: итоги и процессы, затем сотрудники по SUMMARY_ROWS_PER_PAGE строк на страницу"""
+    pages = _PdfPages(output_path)
+    pages.new_page()
+    pages.heading("СВОДНЫЙ ОТЧЁТ ПО ПРОЦЕССАМ", size=16)
+    pages.text(f"Дата формирования: {datetime.now().strftime('%d.%m.%Y %H:%M')}")
+    pages.table([["Показатель", "Значение"]] + aggregate.totals_rows(), [3.5 * inch, 2 * inch])
+
+    col_widths = [2.2 * inch, 0.9 * inch, 0.9 * inch, 0.8 * inch, 1.2 * inch, 1.1 * inch]
+    pages.paged_table("Процессы", PROCESS_HEADER, aggregate.process_rows(), col_widths, [40, 12, 12, 12, 16, 16])
+    col_widths = [2.0 * inch, 1.9 * inch, 0.9 * inch, 0.7 * inch, 0.9 * inch, 0.9 * inch]
+    pages.paged_table("Сотрудники", CANDIDATE_HEADER, _iter_spooled_rows(spool), col_widths, [36, 34, 12, 6, 14, 14])
+    pages.save()
+
+
+def render_summary_excel(aggregate: SummaryAggregate, spool, output_path: str):
+    """XLSX в режиме write_only: строки сотрудников пишутся потоком, без модели всей книги в памяти"""
+    wb = Workbook(write_only=True)
+    header_font = Font(bold=True)
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+
+    def header_row(ws, values):
+        cells = []
+        for value in values:
+            cell = WriteOnlyCell(ws, value=value)
+            cell.font = header_font
+            cell.fill = header_fill
+            cells.append(cell)
+        return cells
+
+    ws = wb.create_sheet("Итоги")
+    ws.column_dimensions["A"].width = 35
+    ws.column_dimensions["B"].width = 20
+    ws.append(header_row(ws, ["Показатель", "Значение"]))
+    ws.append(["Дата формирования", datetime.now().strftime('%d.%m.%Y %H:%M')])
+    for row in aggregate.totals_rows():
+        ws.append(row)
+
+    ws = wb.create_sheet("Процессы")
+    for letter, width in zip("ABCDEF", (40, 12, 12, 10, 20, 18)):
+        ws.column_dimensions[letter].width = width
+    ws.append(header_row(ws, PROCESS_HEADER))
+    for row in aggregate.process_rows():
+        ws.append(row)
+
+    ws = wb.create_sheet("Сотрудники")
+    for letter, width in zip("ABCDEF", (40, 40, 14, 12, 20, 18)):
+        ws.column_dimensions[letter].width = width
+    ws.append(header_row(ws, CANDIDATE_HEADER))
+    for row in _iter_spooled_rows(spool):
+        ws.append(row)
+
+    wb.save(output_path)
+
+
+def generate_summary_report(db: Session, report_format: str = "pdf") -> str:
+    """Строит сводный отчёт (pdf или xlsx) и возвращает путь к временному файлу"""
+    if report_format not in SUMMARY_REPORT_FORMATS:
+        raise ValueError(f"Неподдерживаемый формат отчёта: {report_format}")
+    started = time.perf_counter()
+    fd, output_path = tempfile.mkstemp(suffix=f".{report_format}")
+    os.close(fd)
+    try:
+        with tempfile.TemporaryFile("w+", encoding="utf-8", newline="") as spool:
+            aggregate = aggregate_summary(db, spool)
+            if report_format == "pdf":
+                render_summary_pdf(aggregate, spool, output_path)
+            else:
+                render_summary_excel(aggregate, spool, output_path)
+    except Exception:
+        os.remove(output_path)
+        raise
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    metrics.observe("summary_reports", {
+        "format": report_format, "candidates": aggregate.candidates, "ms": round(elapsed_ms, 1)
+    })
+    return output_path
@@ -303,7 +303,7 @@ export default function AdminDashboardPage() {
             <div className="flex items-center space-x-2">
               <input
                 type="file"
-                accept=".csv"
+                accept=".csv,.xlsx"
                 onChange={(e) => setCsvFile(e.target.files?.[0] || null)}
                 className="text-sm text-gray-500 file:mr-4 file:py-2 file:px-4 file:rounded-lg file:border-0 file:text-sm file:font-semibold file:bg-purple-50 file:text-purple-700 hover:file:bg-purple-100"
               />
@@ -312,7 +312,7 @@ export default function AdminDashboardPage() {
                 disabled={!csvFile || isUploading}
                 className="bg-purple-600 hover:bg-purple-700 disabled:bg-purple-400 text-white px-4 py-2 rounded-lg text-sm font-medium"
               >
-                {isUploading ? 'Загрузка...' : 'Загрузить CSV'}
+                {isUploading ? 'Загрузка...' : 'Загрузить CSV/XLSX'}
               </button>
             </div>
             <button
@@ -11,6 +11,36 @@ interface Message {
   timestamp: Date
 }
 
+// Сколько раз повторять отправку сообщения при сетевом сбое, 429 или 5xx
+const CHAT_RETRIES = 2
+
+const newIdempotencyKey = () =>
+  typeof crypto !== 'undefined' && typeof crypto.randomUUID === 'function'
+    ? crypto.randomUUID()
+    : `${Date.now()}-${Math.random().toString(36).slice(2)}`
+
+// Ключ идемпотентности — один на сообщение: повторы идут с тем же ключом,
+// и сервер вернёт сохранённый ответ вместо повторной записи
+const postChat = async (fullName: string, message: string) => {
+  const idempotencyKey = newIdempotencyKey()
+  for (let attempt = 0; ; attempt++) {
+    try {
+      return await axios.post(
+        `${process.env.NEXT_PUBLIC_BACKEND_URL}/api/chat`,
+        { full_name: fullName, message },
+        { headers: { 'Idempotency-Key': idempotencyKey } }
+      )
+    } catch (error) {
+      if (!axios.isAxiosError(error) || attempt >= CHAT_RETRIES) throw error
+      // Повторяем только сетевые сбои (нет ответа), 429 и 5xx
+      const status = error.response?.status
+      if (status !== undefined && status !== 429 && status < 500) throw error
+      const retryAfter = Number(error.response?.headers['retry-after']) || attempt + 1
+      await new Promise(resolve => setTimeout(resolve, retryAfter * 1000))
+    }
+  }
+}
+
 export default function ChatPage() {
   const router = useRouter()
   const [messages, setMessages] = useState<Message[]>([])
@@ -44,10 +74,7 @@ export default function ChatPage() {
   const startInterview = async (name: string) => {
     setIsLoading(true)
     try {
-      const response = await axios.post(
-        `${process.env.NEXT_PUBLIC_BACKEND_URL}/api/chat`,
-        { full_name: name, message: "Начать интервью" }
-      )
+      const response = await postChat(name, "Начать интервью")
       
       addMessage(response.data.bot_message, true)
       setProgress(response.data.progress)
@@ -101,10 +128,7 @@ export default function ChatPage() {
     setIsLoading(true)
 
     try {
-      const response = await axios.post(
-        `${process.env.NEXT_PUBLIC_BACKEND_URL}/api/chat`,
-        { full_name: fullName, message: userMessage }
-      )
+      const response = await postChat(fullName, userMessage)
       
       addMessage(response.data.bot_message, true)
       setProgress(response.data.progress)